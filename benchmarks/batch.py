@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+    batch
+    ~~~~~
+
+    Measures the per-document overhead of ``pycmark.convert_many()`` compared
+    with ``publish_doctree()`` (and ``publish_string()`` for HTML).
+
+    The overhead is the time to convert an empty text.  The target is to keep
+    the overhead of ``convert_many()`` under a quarter of ``publish_doctree()``.
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List
+
+from docutils.core import publish_doctree, publish_string
+from docutils.writers import get_writer_class
+
+from pycmark import Parser, convert_many
+
+#: texts to convert: name -> text
+TEXTS = OrderedDict([
+    ('empty', ''),
+    ('changelog-entry', '* Fix a crash when `foo` is *empty* (see [#123](https://example.com/123))\n'),
+])
+
+
+def per_document(convert: Callable[[List[str]], None], text: str, count: int = 500, repeat: int = 3) -> float:
+    """Returns the time to convert a document in seconds (the fastest run)."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        convert([text] * count)
+        timings.append((time.perf_counter() - started) / count)
+
+    return min(timings)
+
+
+def publish_each(texts: List[str]) -> None:
+    for text in texts:
+        publish_doctree(text, parser=Parser())
+
+
+def publish_each_to_html(texts: List[str]) -> None:
+    for text in texts:
+        publish_string(text, parser=Parser(), writer=get_writer_class('html5')())
+
+
+def convert_all(texts: List[str]) -> None:
+    for _ in convert_many(texts):
+        pass
+
+
+def convert_all_to_html(texts: List[str]) -> None:
+    for _ in convert_many(texts, writer_name='html5'):
+        pass
+
+
+def measure(text: str) -> Dict[str, float]:
+    """Returns the per-document timings of each way to convert the text."""
+    timings = OrderedDict()
+    timings['publish_doctree'] = per_document(publish_each, text)
+    timings['convert_many'] = per_document(convert_all, text)
+    timings['publish_string (html5)'] = per_document(publish_each_to_html, text)
+    timings['convert_many (html5)'] = per_document(convert_all_to_html, text)
+    return timings
+
+
+def report() -> None:
+    for name, text in TEXTS.items():
+        print('%s:' % name)
+        for stage, timing in measure(text).items():
+            print('    %-28s %8.3f ms' % (stage, timing * 1000))
+        print()
+
+
+if __name__ == '__main__':
+    report()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+    complexity
+    ~~~~~~~~~~
+
+    Pathological inputs for pycmark and utilities to measure how the parsing
+    time grows with the size of input.
+
+    Run this script to report the timings of ``Parser.parse()`` and each
+    transform for every shape.
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+import gc
+import math
+import sys
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Tuple, Type
+
+from docutils import nodes
+from docutils.core import publish_doctree
+from docutils.readers.standalone import Reader
+from docutils.transforms import Transform
+
+from pycmark import Parser
+
+Shape = NamedTuple('Shape', [('generate', Callable[[int], str]), ('sizes', List[int])])
+
+#: pathological shapes of input: name -> (generator, sizes)
+SHAPES = OrderedDict([
+    ('nested-block-quotes', Shape(lambda n: '> ' * n + 'foo\n', [16, 32, 64, 128])),
+    # deeper lists exceed the default recursion limit of Python
+    ('nested-lists', Shape(lambda n: ''.join('  ' * i + '- foo\n' for i in range(n)), [35, 70, 140, 280])),
+    ('nested-brackets', Shape(lambda n: '[' * n + 'foo' + ']' * n, [500, 1000, 2000, 4000])),
+    ('unclosed-brackets', Shape(lambda n: '[' * n, [500, 1000, 2000, 4000])),
+    ('emphasis-chains', Shape(lambda n: '*a_ ' * n, [250, 500, 1000, 2000])),
+    ('mixed-emphasis', Shape(lambda n: '*a **b ' * n, [250, 500, 1000, 2000])),
+    ('unclosed-backticks', Shape(lambda n: ''.join('`' * i + 'a' for i in range(1, n)), [25, 50, 100, 200])),
+    ('link-reference-definitions',
+     Shape(lambda n: (''.join('[label%d]: /url%d\n' % (i, i) for i in range(n)) + '\n' +
+                      ''.join('[label%d] ' % i for i in range(n))),
+           [250, 500, 1000, 2000])),
+    ('long-paragraph', Shape(lambda n: 'lorem *ipsum* `dolor` [sit](amet) &amp; \\* ' * n,
+                             [250, 500, 1000, 2000])),
+    ('hard-linebreaks', Shape(lambda n: 'foo  \nbar\\\n' * n + 'baz\n', [1000, 2000, 4000, 8000])),
+    ('many-headings', Shape(lambda n: ''.join('#' * (i % 3 + 1) + ' foo\n\nbar\n' for i in range(n)),
+                            [1250, 2500, 5000, 10000])),
+])
+
+
+class BenchmarkReader(Reader):
+    def get_transforms(self) -> List[Type[Transform]]:
+        return []  # measure the transforms of pycmark only
+
+
+class BenchmarkParser(Parser):
+    """A parser records the timings of parsing and each transform."""
+
+    def __init__(self, timings: Dict[str, float]) -> None:
+        super().__init__()
+        self.timings = timings
+
+    def get_transforms(self) -> List[Type[Transform]]:
+        return [self.timed(transform) for transform in super().get_transforms()]
+
+    def timed(self, transform: Type[Transform]) -> Type[Transform]:
+        timings = self.timings
+
+        class TimedTransform(transform):  # type: ignore
+            def apply(self, **kwargs) -> None:
+                started = time.perf_counter()
+                super().apply(**kwargs)
+                timings[transform.__name__] = time.perf_counter() - started
+
+        TimedTransform.__name__ = transform.__name__
+        return TimedTransform
+
+    def parse(self, inputtext: str, document: nodes.document) -> None:
+        started = time.perf_counter()
+        super().parse(inputtext, document)
+        self.timings['Parser.parse'] = time.perf_counter() - started
+
+
+def measure(text: str, repeat: int = 3) -> Dict[str, float]:
+    """Converts the text and returns timings of each stage (the fastest run).
+
+    Like :mod:`timeit`, the garbage collector is disabled while converting.  Its
+    cost grows with the number of objects alive, not with the work of pycmark.
+    """
+    results = []
+    for _ in range(repeat):
+        timings: Dict[str, float] = OrderedDict()
+        gc.collect()
+        gc.disable()
+        try:
+            publish_doctree(text, reader=BenchmarkReader(), parser=BenchmarkParser(timings),
+                            settings_overrides={'report_level': 5})
+        finally:
+            gc.enable()
+        timings['total'] = sum(timings.values())
+        results.append(timings)
+
+    return min(results, key=lambda t: t['total'])
+
+
+def fit_exponent(sizes: List[int], timings: List[float]) -> float:
+    """Returns k of ``time = c * size ** k`` fitted by least squares on log-log scale."""
+    xs = [math.log(size) for size in sizes]
+    ys = [math.log(max(timing, 1e-6)) for timing in timings]
+    x_mean = sum(xs) / len(xs)
+    y_mean = sum(ys) / len(ys)
+    numerator = sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys))
+    denominator = sum((x - x_mean) ** 2 for x in xs)
+    return numerator / denominator
+
+
+def measure_shape(name: str) -> Tuple[List[int], List[Dict[str, float]]]:
+    """Measures the shape in each size.  Returns the lengths of input and timings."""
+    shape = SHAPES[name]
+    lengths = []
+    results = []
+    for size in shape.sizes:
+        text = shape.generate(size)
+        lengths.append(len(text))
+        results.append(measure(text))
+
+    return lengths, results
+
+
+def report(names: List[str]) -> None:
+    for name in names:
+        lengths, results = measure_shape(name)
+        print('%s:' % name)
+        print('    %-28s %s  exponent' % ('stage', ' '.join('%9d' % length for length in lengths)))
+        for stage in results[0]:
+            timings = [result[stage] for result in results]
+            exponent = fit_exponent(lengths, timings)
+            print('    %-28s %s  %.2f' % (stage, ' '.join('%9.4f' % t for t in timings), exponent))
+        print()
+
+
+if __name__ == '__main__':
+    report(sys.argv[1:] or list(SHAPES))
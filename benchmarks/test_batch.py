@@ -0,0 +1,20 @@
+"""
+    test_batch
+    ~~~~~~~~~~
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+from batch import convert_all, per_document, publish_each
+
+#: The upper bound of the per-document overhead of convert_many() relative to publish_doctree()
+MAX_OVERHEAD_RATIO = 0.25
+
+
+def test_overhead():
+    publish_doctree = per_document(publish_each, '')
+    convert_many = per_document(convert_all, '')
+    assert convert_many <= publish_doctree * MAX_OVERHEAD_RATIO, \
+        'convert_many() takes %.3f ms per document (publish_doctree(): %.3f ms)' % \
+        (convert_many * 1000, publish_doctree * 1000)
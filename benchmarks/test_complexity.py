@@ -0,0 +1,35 @@
+"""
+    test_complexity
+    ~~~~~~~~~~~~~~~
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+import pytest
+from complexity import SHAPES, fit_exponent, measure_shape
+
+#: The upper bound of the exponent k of ``time = c * size ** k`` (near-linear)
+MAX_EXPONENT = 1.3
+
+#: The shapes known to be super-linear yet
+KNOWN_ISSUES = {
+    'nested-brackets': 'the text between each pair of brackets is normalized as a link label',
+}
+
+
+def shapes():
+    for name in SHAPES:
+        if name in KNOWN_ISSUES:
+            yield pytest.param(name, marks=pytest.mark.xfail(reason=KNOWN_ISSUES[name]))
+        else:
+            yield name
+
+
+@pytest.mark.parametrize('name', list(shapes()))
+def test_complexity(name):
+    lengths, results = measure_shape(name)
+    timings = [result['total'] for result in results]
+    exponent = fit_exponent(lengths, timings)
+    assert exponent <= MAX_EXPONENT, \
+        '%s grows super-linearly: time ~ size ** %.2f (%r)' % (name, exponent, timings)
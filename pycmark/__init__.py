@@ -8,12 +8,15 @@
     :license: Apache License 2.0, see LICENSE for details.
 """
 
-from typing import List, Type
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Type, Union
 
 from docutils import nodes, parsers
+from docutils.core import publish_doctree
 from docutils.transforms import Transform
 
 import pycmark.utils.compat  # Patch docutils  # NOQA
+from pycmark.batch import BatchConverter
 from pycmark.blockparser import BlockParser, BlockProcessor
 from pycmark.blockparser.container_processors import (
     BlockQuoteProcessor,
@@ -40,7 +43,6 @@ from pycmark.blockparser.std_processors import (
     BlankLineProcessor,
     IndentedCodeBlockProcessor,
     ParagraphProcessor,
-    SetextHeadingProcessor,
     ThematicBreakProcessor,
     TildeFencedCodeBlockProcessor,
 )
@@ -60,11 +62,16 @@ from pycmark.inlineparser.std_processors import (
     SoftLinebreakProcessor,
     URIAutolinkProcessor,
 )
-from pycmark.readers import LineReader
+from pycmark.io import MappedFileInput
+from pycmark.parallel import ParallelBlockParser, ParallelInlineTransform
+from pycmark.readers import LineBuffer, LineReader
+from pycmark.streaming import BlockStream
 from pycmark.transforms import (
     BlanklineFilter,
     BracketConverter,
     EmphasisConverter,
+    FusedCleanupTransform,
+    FusedConverterTransform,
     InlineTransform,
     LinebreakFilter,
     SectionTreeConstructor,
@@ -74,12 +81,44 @@ from pycmark.transforms import (
     TightListsDetector,
 )
 
+__version__ = '0.9.6'
+
 
 class Parser(parsers.Parser):
     """CommonMark parser for docutils."""
 
     supported = ('markdown', 'commonmark', 'md')
 
+    #: Clean up the document in a single traversal for each priority
+    #: (see :class:`pycmark.transforms.FusedCleanupTransform` and
+    #: :class:`pycmark.transforms.FusedConverterTransform`).  The transforms fused
+    #: are replaced in :meth:`get_transforms()`; subclasses removing them should
+    #: remove the fused ones instead.
+    fused_transforms = False
+
+    #: The number of worker processes to parse inline elements in parallel
+    #: (see :class:`pycmark.parallel.ParallelInlineTransform`)
+    inline_workers = 0
+
+    #: The minimum size (in characters) of texts to parse inline elements in parallel
+    inline_workers_threshold = 100000
+
+    #: The number of worker processes to parse blocks in parallel
+    #: (see :class:`pycmark.parallel.ParallelBlockParser`)
+    block_workers = 0
+
+    #: The minimum size (in lines) of documents to parse blocks in parallel
+    block_workers_threshold = 100000
+
+    #: The pool of worker processes for the parallel parsing (created on demand,
+    #: and reused for the following documents until :meth:`shutdown()` is called)
+    executor: ProcessPoolExecutor = None
+
+    #: The block parser built on the first parse (reused for the following documents
+    #: unless the block processors or :meth:`create_block_parser()` are changed)
+    block_parser: BlockParser = None
+    block_parser_key: Tuple[Any, ...] = None
+
     def get_block_processors(self) -> List[Type[BlockProcessor]]:
         """Returns block processors. Overrided by subclasses."""
         return [
@@ -100,7 +139,6 @@ class Parser(parsers.Parser):
             ParagraphProcessor,
             ProcessingInstructionHTMLBlockProcessor,
             ScriptHTMLBlockProcessor,
-            SetextHeadingProcessor,
             StandardTagsHTMLBlockProcessor,
             ThematicBreakProcessor,
             TildeFencedCodeBlockProcessor,
@@ -123,7 +161,7 @@ class Parser(parsers.Parser):
         ]
 
     def get_transforms(self) -> List[Type[Transform]]:
-        return [
+        transforms = [
             BlanklineFilter,
             BracketConverter,
             EmphasisConverter,
@@ -136,6 +174,16 @@ class Parser(parsers.Parser):
             TightListsDetector,
         ]
 
+        if self.fused_transforms:
+            for fused in (FusedCleanupTransform, FusedConverterTransform):
+                transforms = [t for t in transforms if t not in fused.fused_transforms]
+                transforms.append(fused)
+
+        if self.inline_workers:
+            transforms = [ParallelInlineTransform if t is InlineTransform else t for t in transforms]
+
+        return transforms
+
     def create_block_parser(self) -> BlockParser:
         """Creates a block parser and returns it.
 
@@ -143,13 +191,86 @@ class Parser(parsers.Parser):
         So you can change the processors by subclassing.
         """
         parser = BlockParser()
-        for processor in self.get_block_processors():
-            parser.add_processor(processor(parser))
+        parser.add_processors(processor(parser) for processor in self.get_block_processors())
         return parser
 
-    def parse(self, inputtext: str, document: nodes.document) -> None:
-        """Parses a text and build document."""
+    def get_executor(self) -> ProcessPoolExecutor:
+        """Returns the pool of worker processes for the parallel parsing.
+
+        It is created on the first call, and kept until :meth:`shutdown()`.
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max(self.inline_workers, self.block_workers))
+        return self.executor
+
+    def shutdown(self) -> None:
+        """Shuts down the pool of worker processes (if created)."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def parse(self, inputtext: Union[str, LineBuffer], document: nodes.document) -> None:
+        """Parses a text and build document.
+
+        The text is given as a string or a :class:`~pycmark.readers.LineBuffer`.
+        The buffer is closed after parsing.
+        """
         document.settings.inline_processors = self.get_inline_processors()
-        reader = LineReader(inputtext.splitlines(True), source=document['source'])
-        block_parser = self.create_block_parser()
-        block_parser.parse(reader, document)
+        document.settings.inline_workers = self.inline_workers
+        document.settings.inline_workers_threshold = self.inline_workers_threshold
+        if isinstance(inputtext, LineBuffer):
+            lines = inputtext
+        else:
+            lines = LineBuffer(inputtext)
+
+        create_block_parser = getattr(self.create_block_parser, '__func__', self.create_block_parser)
+        key = (create_block_parser,) + tuple(self.get_block_processors())
+        if self.block_parser is None or self.block_parser_key != key:
+            self.block_parser = self.create_block_parser()
+            self.block_parser_key = key
+
+        try:
+            if self.block_workers > 1 and len(lines) >= self.block_workers_threshold:
+                ParallelBlockParser(self, self.block_workers).parse(lines, document)
+            else:
+                reader = LineReader(lines, source=document['source'])
+                self.block_parser.parse(reader, document)
+        finally:
+            lines.close()
+
+
+def parse_file(filename: str, parser: Parser = None, settings_overrides: Dict[str, Any] = None) -> nodes.document:
+    """Parses a UTF-8 encoded file and returns a doctree.
+
+    The file is mapped onto memory, and lines are decoded on demand.  Files in
+    other encodings are read at once if the ``input_encoding`` setting is given.
+    """
+    overrides = {'input_encoding': 'utf-8'}
+    overrides.update(settings_overrides or {})
+    return publish_doctree(None, source_path=filename, source_class=MappedFileInput,
+                           parser=parser or Parser(), settings_overrides=overrides)
+
+
+def iterparse(lines: Iterable[str], parser: Parser = None, source_path: str = None,
+              settings_overrides: Dict[str, Any] = None, forward_references: bool = True) -> Iterator[nodes.Node]:
+    """Parses a stream of lines (e.g. a file object) and yields top-level blocks.
+
+    See :class:`pycmark.streaming.BlockStream` for details.
+    """
+    stream = BlockStream(parser or Parser(), lines, source_path, settings_overrides, forward_references)
+    return iter(stream)
+
+
+def convert_many(texts: Iterable[str], parser: Parser = None, writer_name: str = None,
+                 settings_overrides: Dict[str, Any] = None) -> Iterator[Union[nodes.document, str]]:
+    """Converts many texts, and yields their doctrees (or the outputs of the writer, e.g. ``'html5'``).
+
+    The docutils settings and components are built once, and reused for all
+    texts.  See :class:`pycmark.batch.BatchConverter` for details.
+    """
+    converter = BatchConverter(parser or Parser(), writer_name, settings_overrides)
+    try:
+        for text in texts:
+            yield converter.convert(text)
+    finally:
+        converter.close()
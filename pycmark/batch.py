@@ -0,0 +1,71 @@
+"""
+    pycmark.batch
+    ~~~~~~~~~~~~~
+
+    A converter for many documents.
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+import copy
+from typing import Any, Dict, TYPE_CHECKING, Type, Union
+
+from docutils import io, nodes
+from docutils.core import Publisher
+from docutils.readers import get_reader_class
+from docutils.writers import get_writer_class
+
+if TYPE_CHECKING:
+    from pycmark import Parser
+
+
+class BatchConverter:
+    """A converter for many documents sharing the docutils components and settings.
+
+    Building the runtime settings (an option parser, config files and so on)
+    is the most expensive part of ``publish_doctree()`` for small documents.
+    This builds them once, and reuses them (a copy of the settings for each
+    document) with the reader, the parser (and its block parser) and the
+    writer for all documents.  The target of the
+    per-document overhead (the time to convert an empty text) is under a
+    quarter of ``publish_doctree()``; it is measured by ``benchmarks/batch.py``.
+
+    If *writer_name* is given, :meth:`convert()` returns the output of the
+    writer as a string.  Otherwise, it returns a doctree.
+    """
+
+    def __init__(self, parser: "Parser", writer_name: str = None,
+                 settings_overrides: Dict[str, Any] = None) -> None:
+        self.parser = parser
+        self.writer_name = writer_name
+        self.reader = get_reader_class('standalone')(parser=parser)
+        if writer_name is None:
+            self.writer = get_writer_class('null')()
+            self.destination_class: Type[io.Output] = io.NullOutput
+        else:
+            self.writer = get_writer_class(writer_name)()
+            self.destination_class = io.StringOutput
+
+        overrides: Dict[str, Any] = {'output_encoding': 'unicode'}
+        overrides.update(settings_overrides or {})
+        publisher = Publisher(self.reader, self.parser, self.writer)
+        self.settings = publisher.get_settings(**overrides)
+
+    def convert(self, text: str, source_path: str = None) -> Union[nodes.document, str]:
+        """Converts a text to a doctree (or the output of the writer)."""
+        # the settings are modified on processing (e.g. by the parser)
+        settings = copy.copy(self.settings)
+        publisher = Publisher(self.reader, self.parser, self.writer, settings=settings,
+                              source_class=io.StringInput, destination_class=self.destination_class)
+        publisher.set_source(text, source_path or '<string>')
+        publisher.set_destination()
+        output = publisher.publish()
+        if self.writer_name is None:
+            return publisher.document
+        else:
+            return output
+
+    def close(self) -> None:
+        """Shuts down the worker processes of the parser (see :meth:`pycmark.Parser.shutdown()`)."""
+        self.parser.shutdown()
@@ -9,40 +9,92 @@
 """
 
 import re
-from typing import Any, List, Tuple
+from typing import Any, Dict, Iterable, List, Set, Tuple
 
 from docutils.nodes import Element
 
-from pycmark.readers import LineReader
+from pycmark.readers import LineReader, get_first_char
 
 
 class BlockParser:
     """A parser for block elements."""
     def __init__(self) -> None:
         self.processors: List[Tuple[int, "BlockProcessor"]] = []
+        self.dispatch_table: Dict[str, List["BlockProcessor"]] = {}
+        self.fallback_processors: List["BlockProcessor"] = []
+        self.interrupters: Dict[str, List["BlockProcessor"]] = {}
+        self.fallback_interrupters: List["BlockProcessor"] = []
 
     def add_processor(self, processor: "BlockProcessor") -> None:
         """Add a block processor to parser."""
-        self.processors.append((processor.priority, processor))
+        self.add_processors([processor])
+
+    def add_processors(self, processors: Iterable["BlockProcessor"]) -> None:
+        """Add block processors to parser (the dispatch table is built once)."""
+        self.processors.extend((processor.priority, processor) for processor in processors)
         self.processors.sort()
+        self.build_dispatch_table()
+
+    def build_dispatch_table(self) -> None:
+        """Builds an index from the first character of a block to the candidate processors.
+
+        Each list keeps the priority order of ``self.processors``.
+        """
+        chars: Set[str] = set()
+        for _, processor in self.processors:
+            if processor.first_chars is not None:
+                chars.update(processor.first_chars)
+
+        self.dispatch_table = {}
+        for char in chars:
+            self.dispatch_table[char] = [p for _, p in self.processors
+                                         if p.first_chars is None or char in p.first_chars]
+        self.fallback_processors = [p for _, p in self.processors if p.first_chars is None]
+
+        # processors which can interrupt a paragraph
+        self.interrupters = {}
+        for char, processors in self.dispatch_table.items():
+            self.interrupters[char] = [p for p in processors if p.paragraph_interruptable]
+        self.fallback_interrupters = [p for p in self.fallback_processors if p.paragraph_interruptable]
+
+    def get_candidates(self, line: str) -> List["BlockProcessor"]:
+        """Returns processors which can start a block at the line."""
+        return self.lookup_candidates(get_first_char(line))
+
+    def get_interrupters(self, line: str) -> List["BlockProcessor"]:
+        """Returns processors which can interrupt a paragraph at the line."""
+        return self.lookup_interrupters(get_first_char(line))
+
+    def lookup_candidates(self, first_char: str) -> List["BlockProcessor"]:
+        """Returns processors which can start a block beginning with the character."""
+        return self.dispatch_table.get(first_char, self.fallback_processors)
+
+    def lookup_interrupters(self, first_char: str) -> List["BlockProcessor"]:
+        """Returns processors which can interrupt a paragraph by a block beginning with the character."""
+        return self.interrupters.get(first_char, self.fallback_interrupters)
 
     def parse(self, reader: LineReader, document: Element) -> None:
         """Parses a text and build document."""
         while not reader.eof():
-            for _, processor in self.processors:
-                if processor.match(reader):
-                    if processor.run(reader, document):
-                        break
-            else:
-                raise RuntimeError('Failed to parse')
+            self.parse_block(reader, document)
+
+    def parse_block(self, reader: LineReader, document: Element) -> None:
+        """Parses a block starting at the next line, and appends it to the document."""
+        for processor in self.lookup_candidates(reader.first_char(1)):
+            if processor.match(reader):
+                if processor.run(reader, document):
+                    break
+        else:
+            raise RuntimeError('Failed to parse')
 
     def is_interrupted(self, reader: LineReader) -> bool:
-        try:
-            for _, processor in self.processors:
-                if processor.paragraph_interruptable and processor.match(reader):
-                    return True
-        except IOError:
-            pass
+        first_char = reader.first_char(1)
+        if first_char is None:
+            return False
+
+        for processor in self.lookup_interrupters(first_char):
+            if processor.match(reader):
+                return True
 
         return False
 
@@ -54,6 +106,10 @@ class BlockProcessor:
     #: This processor can interrupt a paragraph
     paragraph_interruptable = False
 
+    #: Characters the first non-space character of the block can be
+    #: (a blank line is represented as ``\n``).  None means any character.
+    first_chars: str = None
+
     def __init__(self, parser: BlockParser) -> None:
         self.parser = parser
 
@@ -22,6 +22,7 @@ from pycmark.readers import BlockQuoteReader, LineReader, ListItemReader
 # 5.1 Block quotes
 class BlockQuoteProcessor(PatternBlockProcessor):
     paragraph_interruptable = True
+    first_chars = '>'
     pattern = re.compile('^ {0,3}> ?')
 
     def run(self, reader: LineReader, document: Element) -> bool:
@@ -79,25 +80,23 @@ class ListProcessor(BlockProcessor):
 
     def is_next_list_item(self, reader: LineReader, marker: str) -> bool:
         """Checks the next line is a next list item or not."""
-        try:
-            matched = self.next_item_pattern.match(reader.next_line)
-            if not matched:
-                return False
-            elif not self.is_same_marker_type(marker, matched.group(1).strip()):
-                return False
-            else:
-                return True
-        except IOError:
+        next_line = reader.try_fetch(1)
+        if next_line is None:
+            return False
+
+        matched = self.next_item_pattern.match(next_line)
+        if not matched:
             return False
+        elif not self.is_same_marker_type(marker, matched.group(1).strip()):
+            return False
+        else:
+            return True
 
     def consume_blanklines(self, reader: LineReader, list_item: nodes.list_item) -> None:
         """Skip over blank lines at beginning of the list item."""
-        try:
-            while reader.next_line.strip() == '':
-                reader.step()
-                list_item += addnodes.blankline()
-        except IOError:
-            pass
+        while reader.is_blank(1):
+            reader.step()
+            list_item += addnodes.blankline()
 
     def create_list_node(self, marker: str) -> Element:
         raise NotImplementedError
@@ -109,6 +108,7 @@ class ListProcessor(BlockProcessor):
 # 5.2 List items; bullet lists
 class BulletListProcessor(ListProcessor):
     paragraph_interruptable = False
+    first_chars = '-+*'
     first_item_pattern = re.compile(r'^( {0,3}[-+*])([ \t]+.*|$)')
     next_item_pattern = re.compile(r'^( {0,3}[-+*])([ \t]+.*|$)')
     markers = r'[-+*]'
@@ -117,15 +117,16 @@ class BulletListProcessor(ListProcessor):
         return nodes.bullet_list(bullet=marker)
 
     def is_next_list_item(self, reader: LineReader, marker: str) -> bool:
-        try:
-            pattern = re.compile(r'^(\s*\%s){2,}\s*$' % marker)
-            if pattern.match(reader.next_line):
-                # themantic break detected
-                return False
-            else:
-                return super().is_next_list_item(reader, marker)
-        except IOError:
+        next_line = reader.try_fetch(1)
+        if next_line is None:
+            return False
+
+        pattern = re.compile(r'^(\s*\%s){2,}\s*$' % marker)
+        if pattern.match(next_line):
+            # themantic break detected
             return False
+        else:
+            return super().is_next_list_item(reader, marker)
 
     def is_same_marker_type(self, marker: str, candidate: str) -> bool:
         return marker == candidate
@@ -141,6 +142,7 @@ class NonEmptyBulletListProcessor(BulletListProcessor):
 # 5.2 List items; ordered lists
 class OrderedListProcessor(ListProcessor):
     paragraph_interruptable = False
+    first_chars = '0123456789'
     first_item_pattern = re.compile(r'^( {0,3}\d{1,9}[.)])([ \t]+.*|$)')
     next_item_pattern = re.compile(r'^( {0,3}\d{1,9}[.)])([ \t]+.*|$)')
     markers = r'\d{1,9}[.)]'
@@ -31,6 +31,7 @@ STANDARD_HTML_TAGS = (
 
 class BaseHTMLBlockProcessor(PatternBlockProcessor):
     paragraph_interruptable = True
+    first_chars = '<'
     closing_pattern = re.compile(r'^$')
 
     def run(self, reader: LineReader, document: Element) -> bool:
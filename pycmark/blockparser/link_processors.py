@@ -24,6 +24,7 @@ from pycmark.utils import ESCAPED_CHARS, get_root_document, entitytrans, normali
 # 4.7 Link reference definitions
 class LinkReferenceDefinitionProcessor(PatternBlockProcessor):
     priority = 750  # Before ParagraphProcessor
+    first_chars = '['
     LABEL_CHARACTER = r'(?:[^\[\]\\]|' + ESCAPED_CHARS + r'|\\)'
     pattern = re.compile(r'^ {0,3}\[(' + LABEL_CHARACTER + r'*)(?:\]:|$)')
     following_label_pattern = re.compile('^(' + LABEL_CHARACTER + r'*)(?:\]:|$)')
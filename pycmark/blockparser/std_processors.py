@@ -9,6 +9,7 @@
 """
 
 import re
+import warnings
 
 from docutils import nodes
 from docutils.nodes import Element
@@ -25,6 +26,7 @@ from pycmark.utils import entitytrans, get_root_document, unescape
 class ThematicBreakProcessor(PatternBlockProcessor):
     priority = 200
     paragraph_interruptable = True
+    first_chars = '*-_'
     pattern = re.compile(r'^ {0,3}((\*\s*){3,}|(-\s*){3,}|(_\s*){3,})\s*$')
 
     def run(self, reader: LineReader, document: Element) -> bool:
@@ -36,6 +38,7 @@ class ThematicBreakProcessor(PatternBlockProcessor):
 # 4.2 ATX headings
 class ATXHeadingProcessor(PatternBlockProcessor):
     paragraph_interruptable = True
+    first_chars = '#'
     pattern = re.compile(r'^ {0,3}(#{1,6})(\s.*)$')
     trailing_hashes = re.compile(r'\s+#+\s*$')
 
@@ -51,53 +54,16 @@ class ATXHeadingProcessor(PatternBlockProcessor):
         return True
 
 
-# 4.3 Setext headings
-class SetextHeadingProcessor(BlockProcessor):
-    priority = 750
-    pattern = re.compile(r'^ {0,3}(=+|-+)\s*$')
-    section_level = {'=': 1, '-': 2}
-
-    def match(self, reader: LineReader, **kwargs) -> bool:
-        return True
-
-    def run(self, reader: LineReader, document: Element) -> bool:
-        location = reader.get_source_and_line(incr=1)
-
-        lines = []
-        underline = None
-        try:
-            for line in reader:
-                lines.append(line.lstrip())
-                if self.pattern.match(reader.next_line):
-                    underline = reader.readline()
-                    break
-                elif self.parser.is_interrupted(reader):
-                    break
-        except IOError:
-            pass
-
-        if underline is None:
-            # underline of heading not found. backtracking.
-            reader.step(-len(lines))
-            return False
-        else:
-            text = ''.join(lines).strip()
-            depth = self.section_level[underline.strip()[0]]
-            section = nodes.section(depth=depth)
-            section += nodes.title(text, text)
-            location.set_source_info(section[0])
-            get_root_document(document).note_implicit_target(section)
-
-            document += section
-            return True
-
-
 # 4.4 Indented code blocks
 class IndentedCodeBlockProcessor(PatternBlockProcessor):
     paragraph_interruptable = False
     pattern = re.compile(r'^    (.*\n?)$')
     followings = re.compile(r'^(    (.*\n?)|\s*)$')
 
+    def match(self, reader: LineReader, **kwargs) -> bool:
+        indent = reader.indent(1)
+        return indent is not None and indent >= 4
+
     def run(self, reader: LineReader, document: Element) -> bool:
         location = reader.get_source_and_line(incr=1)
 
@@ -112,6 +78,7 @@ class IndentedCodeBlockProcessor(PatternBlockProcessor):
 # 4.5 Fenced code blocks
 class BacktickFencedCodeBlockProcessor(PatternBlockProcessor):
     paragraph_interruptable = True
+    first_chars = '`'
     pattern = re.compile(r'^( {0,3})(`{3,})([^`]*)$')
 
     def run(self, reader: LineReader, document: Element) -> bool:
@@ -133,38 +100,74 @@ class BacktickFencedCodeBlockProcessor(PatternBlockProcessor):
 
 class TildeFencedCodeBlockProcessor(BacktickFencedCodeBlockProcessor):
     paragraph_interruptable = True
+    first_chars = '~'
     pattern = re.compile(r'^( {0,3})(~{3,})(.*)$')
 
 
+# 4.3 Setext headings
 # 4.8 Paragraphs
 class ParagraphProcessor(BlockProcessor):
     priority = 800
+    underline_pattern = re.compile(r'^ {0,3}(=+|-+)\s*$')
+    section_level = {'=': 1, '-': 2}
 
     def match(self, reader: LineReader, **kwargs) -> bool:
         return True
 
     def run(self, reader: LineReader, document: Element) -> bool:
         location = reader.get_source_and_line(incr=1)
-        reader = LazyLineReader(reader)
+        lazy_reader = LazyLineReader(reader)
+
+        lines = []
+        underline = None
+        setext_available = True
+        for line in lazy_reader:
+            lines.append(line.lstrip())
+            if setext_available:
+                # the underline of setext heading can't be a lazy continuation line
+                next_line = reader.try_fetch(1)
+                if next_line is None:
+                    setext_available = False
+                elif self.underline_pattern.match(next_line):
+                    underline = reader.readline()
+                    break
 
-        text = ''
-        for line in reader:
-            text += line.lstrip()
-            if self.parser.is_interrupted(reader):
+            if self.parser.is_interrupted(lazy_reader):
                 break
 
-        node = nodes.paragraph(text.strip(), text.strip())
-        location.set_source_info(node)
-        document += node
+        text = ''.join(lines).strip()
+        if underline is None:
+            node: Element = nodes.paragraph(text, text)
+            location.set_source_info(node)
+        else:
+            depth = self.section_level[underline.strip()[0]]
+            node = nodes.section(depth=depth)
+            node += nodes.title(text, text)
+            location.set_source_info(node[0])
+            get_root_document(document).note_implicit_target(node)
 
+        document += node
         return True
 
 
+class SetextHeadingProcessor(ParagraphProcessor):
+    """Deprecated.  Setext headings are recognized by :class:`ParagraphProcessor`."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        warnings.warn('SetextHeadingProcessor is deprecated.  Use ParagraphProcessor instead.',
+                      DeprecationWarning, stacklevel=2)
+        super().__init__(*args, **kwargs)
+
+
 # 4.9 Blank lines
 class BlankLineProcessor(PatternBlockProcessor):
     paragraph_interruptable = True
+    first_chars = '\n'
     pattern = re.compile(r'^\s*$')
 
+    def match(self, reader: LineReader, **kwargs) -> bool:
+        return reader.is_blank(1)
+
     def run(self, reader: LineReader, document: Element) -> bool:
         reader.readline()  # skip the line
         document += addnodes.blankline()
@@ -0,0 +1,365 @@
+"""
+    pycmark.cache
+    ~~~~~~~~~~~~~
+
+    Caches of parsed doctrees.
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple, Type, Union
+
+import docutils
+from docutils import nodes, parsers
+from docutils.frontend import Values
+from docutils.nodes import Node
+from docutils.transforms import Transform
+
+import pycmark
+from pycmark import Parser
+from pycmark.incremental import IncrementalParser
+from pycmark.readers import LineBuffer
+from pycmark.utils import report_again
+
+#: the destination and the title of a link reference definition
+Definition = Optional[Tuple[Optional[str], Optional[str]]]
+
+#: a message reported on converting a block, and the index of the transform reported it
+Message = Tuple[int, nodes.system_message]
+
+
+def resolve_link_label(document: nodes.document, label: str) -> Definition:
+    """Returns the definition of the link label in the document (or None if not defined)."""
+    node_id = document.nameids.get(label)
+    if node_id is None:
+        return None
+
+    target = document.ids[node_id]
+    return (target.get('refuri'), target.get('title'))
+
+
+class DoctreeCache:
+    """A content-addressed cache of doctrees on disk.
+
+    Each doctree is stored as a compressed pickle named after its key.  Entries
+    are written atomically, so the directory can be shared by builds running
+    concurrently.  When the total size of entries exceeds *max_size* bytes, the
+    least recently used entries are removed.
+    """
+
+    suffix = '.doctree'
+
+    #: the ratio of *max_size* the entries are evicted down to
+    low_watermark = 0.9
+
+    def __init__(self, directory: str, max_size: int = 256 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.size: Optional[int] = None  # total size of entries (scanned on demand)
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def load(self, key: str) -> Optional[Tuple[nodes.document, List[nodes.system_message]]]:
+        """Returns the doctree for the key and the messages reported on building it.
+
+        Returns None if not cached.
+        """
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            document, messages = pickle.loads(zlib.decompress(data))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # broken entry (or it was pickled with other versions of classes)
+            self.misses += 1
+            self.remove(path)
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass  # removed by other process
+
+        self.hits += 1
+        return document, messages
+
+    def store(self, key: str, document: nodes.document, messages: List[nodes.system_message] = []) -> None:
+        """Stores the doctree for the key, and the messages reported on building it."""
+        # detach the objects only available while processing
+        reporter, transformer, settings = document.reporter, document.transformer, document.settings
+        try:
+            document.reporter = document.transformer = document.settings = None
+            data = zlib.compress(pickle.dumps((document, messages), pickle.HIGHEST_PROTOCOL))
+        except RecursionError:
+            return  # too deeply nested to pickle; not cached
+        finally:
+            document.reporter, document.transformer, document.settings = reporter, transformer, settings
+
+        path = self.get_path(key)
+        try:
+            old_size = os.path.getsize(path)  # the entry to overwrite
+        except OSError:
+            old_size = 0
+
+        fd, tmpname = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmpname, path)
+        except BaseException:
+            self.remove(tmpname)
+            raise
+
+        if self.size is None:
+            self.size = sum(size for _, size, _ in self.scan())
+        else:
+            self.size += len(data) - old_size
+
+        if self.size > self.max_size:
+            self.evict()
+
+    def scan(self) -> List[Tuple[float, int, str]]:
+        """Returns the last access time, the size and the path of entries."""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix):
+                try:
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                except OSError:
+                    pass  # removed by other process
+
+        return entries
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the total size falls under the low watermark."""
+        entries = sorted(self.scan())
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.size <= self.max_size * self.low_watermark:
+                break
+
+            self.remove(path)
+            self.size -= size
+
+    def remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class CachedParser(parsers.Parser):
+    """A parser serving doctrees from a :class:`DoctreeCache`.
+
+    The cache key is a hash of the source text, the processors and transforms
+    of the parser, the settings changing the doctree (``key_settings``), and the
+    versions of pycmark and docutils.  A doctree is
+    cached after the transforms of the parser, so they are applied on parsing
+    (before the transforms of other components) instead of being returned by
+    :meth:`get_transforms()`.  On a cache hit, no parsing and transforms run.
+
+    The messages reported on parsing are stored with the doctree, and they are
+    reported again on a cache hit.  The messages of the transforms are placed
+    in the document as the ones of the transforms applied by docutils (e.g. in
+    the "Docutils System Messages" section).  The nodes and the messages are
+    relocated to the source of the document.
+    """
+
+    supported = Parser.supported
+
+    #: the settings changing the doctree built by the parser (the identifiers of nodes)
+    key_settings = ('auto_id_prefix', 'id_prefix')
+
+    def __init__(self, cache: DoctreeCache, parser: Parser = None) -> None:
+        self.cache = cache
+        self.parser = parser or Parser()
+
+    def get_transforms(self) -> List[Type[Transform]]:
+        return []  # applied on parsing
+
+    def get_key(self, inputtext: Union[str, LineBuffer], settings: Values = None) -> str:
+        """Returns the cache key for the text (and the settings if given)."""
+        def get_names(classes: List[type]) -> bytes:
+            return repr(['%s.%s' % (cls.__module__, cls.__qualname__) for cls in classes]).encode()
+
+        digest = hashlib.sha256()
+        digest.update(('%s:%s\0' % (pycmark.__version__, docutils.__version__)).encode())
+        digest.update(get_names(self.parser.get_block_processors()) + b'\0')
+        digest.update(get_names(self.parser.get_inline_processors()) + b'\0')
+        digest.update(get_names(self.parser.get_transforms()) + b'\0')
+        if settings is not None:
+            values = [getattr(settings, name, None) for name in self.key_settings]
+            digest.update(repr(values).encode() + b'\0')
+        if isinstance(inputtext, str):
+            digest.update(inputtext.encode())
+        elif isinstance(inputtext.source, str):
+            digest.update(inputtext.source.encode())
+        else:
+            digest.update(inputtext.source)  # UTF-8 encoded bytes (e.g. a memory-mapped file)
+
+        return digest.hexdigest()
+
+    def parse(self, inputtext: Union[str, LineBuffer], document: nodes.document) -> None:
+        key = self.get_key(inputtext, document.settings)
+        cached = self.cache.load(key)
+        if cached is None:
+            messages: List[nodes.system_message] = []
+            document.reporter.attach_observer(messages.append)
+            try:
+                self.parser.parse(inputtext, document)
+                document.reporter.attach_observer(document.note_transform_message)
+                try:
+                    for transform_class in sorted(self.parser.get_transforms(), key=lambda t: t.default_priority):
+                        transform_class(document).apply()
+                finally:
+                    document.reporter.detach_observer(document.note_transform_message)
+            finally:
+                document.reporter.detach_observer(messages.append)
+            self.cache.store(key, document, messages)
+        else:
+            if isinstance(inputtext, LineBuffer):
+                inputtext.close()
+            self.restore(*cached, document)
+
+    def restore(self, cached: nodes.document, messages: List[nodes.system_message],
+                document: nodes.document) -> None:
+        """Moves the nodes and the registry of names and ids of the cached doctree to the document.
+
+        The nodes are relocated to the source of the document, and the messages
+        are reported again.
+        """
+        excludes = ('attributes', 'children', 'current_line', 'current_source', 'include_log',
+                    'line', 'parent', 'parse_messages', 'rawsource', 'reporter', 'settings', 'source',
+                    'transform_messages', 'transformer')
+        for name, value in vars(cached).items():
+            if name in vars(document) and name not in excludes and not name.endswith('document'):
+                setattr(document, name, value)
+
+        document.extend(cached.children)
+        for node in document.findall():
+            node.document = document
+            if node.source is not None:
+                node.source = document['source']
+
+        transform_messages = set(id(message) for message in cached.transform_messages)
+        for message in messages:
+            reported = report_again(document.reporter, message, document['source'])
+            if id(message) in transform_messages:
+                document.transform_messages.append(reported)
+
+
+class BlockCache:
+    """An in-process LRU cache of converted top-level blocks.
+
+    Entries are keyed by the source of a block.  Each entry records the link
+    labels looked up on its conversion and their definitions, and it is reused
+    only if the labels resolve to the same definitions in the current document.
+    The messages reported on the conversion are also recorded (with the index of
+    the transform reported each of them), to report them again on reuse.  At
+    most *maxsize* entries are kept.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self.entries: Dict[str, List[Tuple[Dict[str, Definition], List[Node], int, List[Message]]]] = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        if total == 0:
+            return 0.0
+        else:
+            return self.hits / total
+
+    def lookup(self, source: str, document: nodes.document,
+               lineno: int) -> Optional[Tuple[List[Node], Set[str], List[Message]]]:
+        """Returns a copy of the converted nodes of the block, the link labels it refers
+        to and the messages reported on the conversion.
+
+        *document* holds the link reference definitions, and *lineno* is the
+        line number the block starts at (to relocate the copies).
+        """
+        for definitions, converted, cached_lineno, messages in self.entries.get(source, []):
+            if all(resolve_link_label(document, label) == value for label, value in definitions.items()):
+                self.entries.move_to_end(source)  # type: ignore
+                self.hits += 1
+                copied = [node.deepcopy() for node in converted]
+                for node in copied:
+                    for child in node.findall():
+                        if child.source is not None:
+                            child.source = document['source']
+                        if child.line is not None:
+                            child.line += lineno - cached_lineno
+
+                relocated = []
+                for index, message in messages:
+                    message = message.deepcopy()
+                    if message.get('source') is not None:
+                        message['source'] = document['source']
+                    if message.get('line') is not None:
+                        message['line'] += lineno - cached_lineno
+                    relocated.append((index, message))
+
+                return copied, set(definitions), relocated
+
+        self.misses += 1
+        return None
+
+    def store(self, source: str, document: nodes.document, lineno: int,
+              converted: List[Node], labels: Set[str], messages: List[Message] = []) -> None:
+        """Stores a copy of the converted nodes of the block, and the messages."""
+        definitions = {label: resolve_link_label(document, label) for label in labels}
+        copied = [node.deepcopy() for node in converted]
+        self.entries.setdefault(source, []).append((definitions, copied, lineno, messages))
+        self.entries.move_to_end(source)  # type: ignore
+        self.size += 1
+        while self.size > self.maxsize:
+            _, evicted = self.entries.popitem(last=False)  # type: ignore
+            self.size -= len(evicted)
+
+
+class BlockCachedParser(parsers.Parser):
+    """A parser reusing converted top-level blocks through a :class:`BlockCache`.
+
+    Blocks are still split by the block parser, but the inline parsing and the
+    transforms are skipped for the blocks found in the cache.  Like
+    :class:`CachedParser`, the transforms of the parser are applied on parsing.
+    """
+
+    supported = Parser.supported
+
+    def __init__(self, block_cache: BlockCache, parser: Parser = None) -> None:
+        self.block_cache = block_cache
+        self.parser = parser or Parser()
+
+    def get_transforms(self) -> List[Type[Transform]]:
+        return []  # applied on parsing
+
+    def parse(self, inputtext: Union[str, LineBuffer], document: nodes.document) -> None:
+        if isinstance(inputtext, LineBuffer):
+            lines = inputtext
+            inputtext = ''.join(lines)
+            lines.close()
+
+        parser = IncrementalParser(self.parser, document['source'], block_cache=self.block_cache,
+                                   settings=document.settings)
+        parser.parse(inputtext)
+        parser.get_doctree(document)
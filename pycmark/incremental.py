@@ -0,0 +1,311 @@
+"""
+    pycmark.incremental
+    ~~~~~~~~~~~~~~~~~~~
+
+    An incremental parser for editors.
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Any, Dict, List, Optional, Set, TYPE_CHECKING, Tuple, Type, cast
+
+from docutils import nodes
+from docutils.core import Publisher
+from docutils.frontend import Values
+from docutils.nodes import Element, Node, TextElement
+from docutils.transforms import Transform
+from docutils.utils import new_document
+
+from pycmark import Parser, addnodes
+from pycmark.readers import LineBuffer, StreamLineReader
+from pycmark.streaming import is_text_container
+from pycmark.transforms import InlineTransform, SectionTreeConstructor
+from pycmark.utils import collect_messages, note_targets, report_again
+
+if TYPE_CHECKING:
+    from pycmark.cache import BlockCache
+
+
+class Block:
+    """A top-level block and its line range in the source (0 origin, the end is exclusive)."""
+
+    def __init__(self, start: int, end: int, raw: List[Node]) -> None:
+        self.start = start
+        self.end = end
+        self.lineno = start  # the line number the block was parsed at
+
+        #: nodes built by the block parser
+        self.raw = raw
+
+        #: nodes converted by the inline parser and transforms
+        self.nodes: List[Node] = []
+
+        #: link reference definitions in the block
+        self.definitions = [(target['names'][0], target)
+                            for node in raw for target in node.findall(nodes.target)]
+
+        #: link labels the block refers to
+        self.references: Set[str] = set()
+
+        #: messages reported on converting the block, and the index of the transform
+        #: reported each of them (-1 for the inline parser)
+        self.messages: List[Tuple[int, nodes.system_message]] = []
+
+    @property
+    def is_blank(self) -> bool:
+        return all(isinstance(node, addnodes.blankline) for node in self.raw)
+
+    def shift(self, delta: int) -> None:
+        self.start += delta
+        self.end += delta
+
+    def __repr__(self) -> str:
+        return '<Block: %d-%d %s>' % (self.start, self.end, ' '.join(n.__class__.__name__ for n in self.raw))
+
+
+class ContainerSectionTreeConstructor(SectionTreeConstructor):
+    """Constructs the tree of sections in the containers except the document.
+
+    The tree of sections at the top-level is constructed after all blocks are converted.
+    """
+
+    def apply(self, **kwargs) -> None:
+        def is_container_node(node: Node) -> bool:
+            return isinstance(node, (nodes.block_quote, nodes.list_item))
+
+        for node in list(self.document.findall(is_container_node)):
+            self.construct_section_tree(cast(Element, node))
+
+
+class IncrementalParser:
+    """A parser keeping the parsed blocks to update them on each edit of the source.
+
+    :meth:`edit()` parses blocks again from the nearest safe boundary before the
+    edit until the structure of blocks matches the previous parse again.  Only
+    the re-parsed blocks are converted by the inline parser, and the blocks
+    referring to the link labels whose definitions have changed.
+
+    Line numbers are 0 origin, and line ranges exclude their end.
+
+    If *block_cache* is given, converted blocks are reused through it (see
+    :class:`pycmark.cache.BlockCache`).  *settings* are built from
+    *settings_overrides* if not given.
+    """
+
+    def __init__(self, parser: Parser = None, source_path: str = None,
+                 settings_overrides: Dict[str, Any] = None, block_cache: "BlockCache" = None,
+                 settings: Values = None) -> None:
+        self.parser = parser or Parser()
+        self.block_cache = block_cache
+        if settings is None:
+            settings = Publisher(parser=self.parser).get_settings(**(settings_overrides or {}))
+        self.settings = settings
+        self.settings.inline_processors = self.parser.get_inline_processors()
+        self.source_path = source_path or '<string>'
+        self.block_parser = self.parser.create_block_parser()
+        self.transforms: List[Type[Transform]] = []
+        for transform in self.parser.get_transforms():
+            if issubclass(transform, SectionTreeConstructor):
+                self.transforms.append(ContainerSectionTreeConstructor)
+            elif not issubclass(transform, InlineTransform):
+                self.transforms.append(transform)
+        self.transforms.sort(key=lambda t: t.default_priority)
+
+        self.lines: List[str] = []
+        self.blocks: List[Block] = []
+
+        #: a document holding the effective link reference definitions
+        self.document = self.new_document()
+        self.inline_parser = InlineTransform(self.document).create_parser()
+
+    def new_document(self) -> nodes.document:
+        return new_document(self.source_path, self.settings)
+
+    def parse(self, text: str) -> List[Block]:
+        """Parses the whole text, and returns the blocks."""
+        self.lines = []
+        self.blocks = []
+        self.document = self.new_document()
+        self.edit(0, 0, text)
+        return self.blocks
+
+    def edit(self, start: int, end: int, text: str) -> List[Block]:
+        """Replaces the lines from *start* to *end* by the text, and updates the blocks.
+
+        Returns the blocks converted again.
+        """
+        lines = LineBuffer(text)[:]
+        self.lines[start:end] = lines
+        delta = len(lines) - (end - start)
+
+        # terminate the lines joined to the following line
+        for i in range(max(start - 1, 0), min(start + len(lines), len(self.lines) - 1)):
+            if not self.lines[i].endswith('\n'):
+                self.lines[i] += '\n'
+
+        first = self.find_restart_point(start)
+        restart = self.blocks[first].start if first < len(self.blocks) else 0
+        parsed, last = self.parse_blocks(restart, start + len(lines), end, delta)
+        for block in self.blocks[last:]:
+            block.shift(delta)
+
+        removed = self.blocks[first:last]
+        self.blocks[first:last] = parsed
+
+        changed = parsed[:]
+        if self.get_definitions(removed) != self.get_definitions(parsed):
+            for block in self.update_definitions():
+                if block not in changed:
+                    changed.append(block)
+
+        for block in parsed:
+            self.convert(block)
+
+        return changed
+
+    def find_restart_point(self, lineno: int) -> int:
+        """Returns the index of the nearest block the parse can restart at for an edit at *lineno*.
+
+        The extent of a block is decided by the lines before the following blank
+        line.  So the parse can restart at a block following a blank line.
+        """
+        index = bisect_right([block.start for block in self.blocks], lineno) - 1
+        while index > 0 and not self.blocks[index - 1].is_blank:
+            index -= 1
+
+        return max(index, 0)
+
+    def parse_blocks(self, lineno: int, edited: int, old_end: int, delta: int) -> Tuple[List[Block], int]:
+        """Parses blocks from *lineno* until the boundaries of blocks match the previous parse.
+
+        Returns the parsed blocks, and the index of the first old block to keep.
+        """
+        starts = [block.start for block in self.blocks]
+        document = self.new_document()
+        reader = StreamLineReader(islice(self.lines, lineno, None), self.source_path, lineno)
+        parsed: List[Block] = []
+        while not reader.eof():
+            if reader.lineno >= edited:
+                index = bisect_left(starts, reader.lineno - delta)
+                if index < len(starts) and starts[index] == reader.lineno - delta >= old_end:
+                    return parsed, index  # re-synchronized
+
+            start = reader.lineno
+            reader.discard()
+            self.block_parser.parse_block(reader, document)
+            parsed.append(Block(start, reader.lineno, document.children[:]))
+            del document.children[:]
+
+        return parsed, len(self.blocks)
+
+    def get_definitions(self, blocks: List[Block]) -> List[Tuple[str, Optional[str], Optional[str]]]:
+        return [(label, target.get('refuri'), target.get('title'))
+                for block in blocks for label, target in block.definitions]
+
+    def update_definitions(self) -> List[Block]:
+        """Rebuilds the link reference definitions, and converts the blocks referring to changed ones.
+
+        Returns the converted blocks.
+        """
+        def get_targets() -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+            targets: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+            for label, refuri, title in self.get_definitions(self.blocks):
+                targets.setdefault(label, (refuri, title))
+            return targets
+
+        old_targets = {label: (target.get('refuri'), target.get('title'))
+                       for label, target in self.get_effective_targets()}
+        new_targets = get_targets()
+        labels = {label for label in old_targets.keys() | new_targets.keys()
+                  if old_targets.get(label) != new_targets.get(label)}
+
+        self.document = self.new_document()
+        for block in self.blocks:
+            for label, target in block.definitions:
+                if label not in self.document.nameids:
+                    target = target.deepcopy()
+                    target['ids'] = []
+                    self.document.note_explicit_target(target)
+
+        changed = [block for block in self.blocks if block.references & labels]
+        for block in changed:
+            self.convert(block)
+
+        return changed
+
+    def get_effective_targets(self) -> List[Tuple[str, Element]]:
+        return [(label, self.document.ids[node_id]) for label, node_id in self.document.nameids.items()]
+
+    def convert(self, block: Block) -> None:
+        """Applies inline parsing and transforms to the block."""
+        if self.block_cache is not None:
+            source = ''.join(self.lines[block.start:block.end])
+            cached = self.block_cache.lookup(source, self.document, block.lineno)
+            if cached:
+                block.nodes, block.references, cached_messages = cached
+                block.messages = [(index, report_again(self.document.reporter, message))
+                                  for index, message in cached_messages]
+                return
+
+        self.document.current_line = None  # not to give the line of the last warning to nodes
+        self.document.extend(node.deepcopy() for node in block.raw)
+        self.inline_parser.referenced_labels = set()
+        with collect_messages(self.document.reporter) as reported:
+            for node in list(self.document.findall(is_text_container)):
+                self.inline_parser.parse(cast(TextElement, node))
+        block.messages = [(-1, message) for message in reported]
+
+        for index, transform_class in enumerate(self.transforms):
+            with collect_messages(self.document.reporter) as reported:
+                transform_class(self.document).apply()
+            block.messages.extend((index, message) for message in reported)
+
+        block.nodes = self.document.children[:]
+        block.references = self.inline_parser.referenced_labels
+        del self.document.children[:]
+
+        if self.block_cache is not None:
+            self.block_cache.store(source, self.document, block.lineno, block.nodes, block.references,
+                                   block.messages)
+
+    def get_doctree(self, document: nodes.document = None) -> nodes.document:
+        """Returns a doctree built from the blocks (into the *document* if given).
+
+        The messages reported on converting the blocks are noted in the document
+        as transform messages, in the order the transforms of the parser report.
+        """
+        if document is None:
+            document = self.new_document()
+
+        messages: List[Tuple[Tuple[int, int], nodes.system_message]] = []
+        for block in self.blocks:
+            for node in block.nodes:
+                node = node.deepcopy()
+                if block.lineno != block.start:
+                    for child in node.findall():
+                        if child.line is not None:
+                            child.line += block.start - block.lineno
+                document += node
+
+            for index, message in block.messages:
+                message = message.deepcopy()
+                if message.get('line') is not None:
+                    message['line'] += block.start - block.lineno
+                messages.append(((index, 1), message))
+
+        note_targets(document)
+        with collect_messages(document.reporter) as section_messages:
+            ContainerSectionTreeConstructor(document).construct_section_tree(document)
+
+        # the top-level sections are constructed before the ones in containers
+        if ContainerSectionTreeConstructor in self.transforms:
+            index = self.transforms.index(ContainerSectionTreeConstructor)
+        else:
+            index = len(self.transforms)
+        messages.extend(((index, 0), message) for message in section_messages)
+        messages.sort(key=lambda item: item[0])
+        document.transform_messages.extend(message for _, message in messages)
+        return document
@@ -10,57 +10,138 @@
 
 import re
 from functools import wraps
-from typing import Any, Callable, List, Tuple, cast
+from typing import Any, Callable, Iterable, List, Pattern, Set, Tuple, cast
 
 from docutils.nodes import Element, Text, TextElement
 
-from pycmark.addnodes import SparseText
+from pycmark.inlineparser.tokens import ACTIVE, TEXT, Token, resolve_tokens
 from pycmark.readers import TextReader
 
 
+class BracketStack:
+    """A stack of link openers (``[`` and ``![``) found in the text being parsed."""
+
+    def __init__(self) -> None:
+        self.stack: List[Tuple[Token, int, int]] = []
+        self.links = 0  # number of links found so far
+
+    def __len__(self) -> int:
+        return len(self.stack)
+
+    def push(self, opener: Token, index: int) -> None:
+        """Pushes an opener and its index in the children of the parsing node."""
+        self.stack.append((opener, index, self.links))
+
+    def pop(self) -> Tuple[Token, int]:
+        """Pops the last opener and its index.
+
+        The opener is deactivated if a link has been found after the opener was pushed.
+        """
+        opener, index, links = self.stack.pop()
+        if str(opener) == '[' and links < self.links:
+            opener.flags &= ~ACTIVE
+
+        return opener, index
+
+    def deactivate_links(self) -> None:
+        """Deactivates all ``[`` openers in the stack (links may not contain other links)."""
+        self.links += 1
+
+
 class InlineParser:
     """A parser for inline elements."""
 
     def __init__(self) -> None:
         self.processors: List[Tuple[int, "InlineProcessor"]] = []
+        self.trigger_pattern: Pattern = None
+        self.brackets = BracketStack()
+
+        #: link labels looked up
+        self.referenced_labels: Set[str] = set()
+
+        #: link labels looked up but not defined (used to detect forward references)
+        self.undefined_labels: Set[str] = set()
 
     def add_processor(self, processor: "InlineProcessor") -> None:
         """Add a inline processor to parser."""
-        self.processors.append((processor.priority, processor))
+        self.add_processors([processor])
+
+    def add_processors(self, processors: Iterable["InlineProcessor"]) -> None:
+        """Add inline processors to parser (the trigger pattern is built once)."""
+        self.processors.extend((processor.priority, processor) for processor in processors)
         self.processors.sort()
+        self.build_trigger_pattern()
+
+    def build_trigger_pattern(self) -> None:
+        """Builds a pattern to find the next position any processor can start."""
+        triggers = [processor.trigger for _, processor in self.processors]
+        if None in triggers:
+            self.trigger_pattern = None  # some processor can start anywhere
+        else:
+            self.trigger_pattern = re.compile('|'.join('(?:%s)' % t for t in triggers))
+
+    def find_next_trigger(self, reader: TextReader) -> int:
+        """Returns the next position some processor can start at."""
+        if self.trigger_pattern is None:
+            return reader.position
+
+        matched = self.trigger_pattern.search(reader.subject, reader.position)
+        if matched:
+            return matched.start()
+        else:
+            return len(reader.subject)
 
     def parse(self, document: TextElement) -> TextElement:
-        """Parses a text and build TextElement."""
+        """Parses a text and build TextElement.
+
+        Markers of emphasis and links are placed into the children of the element
+        as tokens (see :class:`~pycmark.inlineparser.tokens.Token`) while parsing.
+        They are resolved into nodes at the end.
+        """
         if len(document) == 0:
             return document
 
         reader = TextReader(cast(Text, document.pop()))
-        while reader.remain:
+        self.brackets = BracketStack()
+        while not reader.at_end:
+            position = self.find_next_trigger(reader)
+            if position > reader.position:
+                # skip over plain text
+                self.append_text(reader, document, position)
+                continue
+
             for _, processor in self.processors:
                 if processor.match(reader):
                     if processor.run(reader, document) is True:
                         break
             else:
-                if len(document) > 0 and isinstance(document[-1], SparseText):
-                    tail = document[-1]
-                    tail.spread(end=1)
-                else:
-                    tail = SparseText(reader.subject, reader.position, reader.position + 1)
-                    document += tail
-
-                if reader.remain[0] == '\\':  # escaped
-                    tail.spread(end=1)
-                    reader.step(2)
+                if reader.peek() == '\\':  # escaped
+                    self.append_text(reader, document, reader.position + 2)
                 else:
-                    reader.step(1)
+                    self.append_text(reader, document, reader.position + 1)
 
+        resolve_tokens(document)
         return document
 
+    def append_text(self, reader: TextReader, document: TextElement, end: int) -> None:
+        """Appends a text until the *end* position to the document as a plain text."""
+        tail = document[-1] if len(document) > 0 else None
+        if isinstance(tail, Token) and tail.kind == TEXT:
+            tail.spread(end=end - reader.position)
+        else:
+            document += Token(TEXT, reader.subject, reader.position, end)
+
+        reader.position = end
+
 
 class InlineProcessor:
     #: priority of the processor (1-999)
     priority = 500
 
+    #: A regular expression which matches the positions the processor can start at.
+    #: None means any position.
+    trigger: str = None
+
     def __init__(self, parser: InlineParser) -> None:
         self.parser = parser
 
@@ -75,10 +156,18 @@ class InlineProcessor:
 
 
 class PatternInlineProcessor(InlineProcessor):
+    """An inline processor matching a regular expression at the current position.
+
+    The pattern is matched against the whole text with a start position
+    (``pattern.match(subject, pos)``), not against the rest of text.  So ``^``
+    and ``\\A`` match only at the beginning of the whole text, and lookbehind
+    assertions see the text before the current position.
+    """
+
     pattern = re.compile('^$')
 
     def match(self, reader: TextReader, **kwargs) -> bool:
-        return bool(self.pattern.match(reader.remain))
+        return bool(reader.match(self.pattern))
 
 
 class UnmatchedTokenError(Exception):
@@ -9,17 +9,17 @@
 """
 
 import re
-from typing import Tuple
+from typing import Tuple, cast
 
 from docutils import nodes
 from docutils.nodes import Element, Text
 
-from pycmark import addnodes
 from pycmark.inlineparser import PatternInlineProcessor, backtrack_onerror
+from pycmark.inlineparser.tokens import ACTIVE, BRACKET, CAN_OPEN, Token, resolve_tokens
 from pycmark.readers import TextReader
 from pycmark.utils import entitytrans, normalize_uri
 from pycmark.utils import (
-    ESCAPED_CHARS, escaped_chars_pattern, get_root_document, normalize_link_label, unescape, transplant_nodes
+    ESCAPED_CHARS, escaped_chars_pattern, get_root_document, normalize_link_label, unescape
 )
 
 LABEL_NOT_MATCHED = object()
@@ -28,45 +28,49 @@ LABEL_NOT_MATCHED = object()
 # 6.5 Links
 # 6.6 Images
 class LinkOpenerProcessor(PatternInlineProcessor):
+    trigger = r'\!?\['
     pattern = re.compile(r'\!?\[')
 
     def run(self, reader: TextReader, document: Element) -> bool:
-        marker = reader.consume(self.pattern).group(0)
-        document += addnodes.bracket(marker=marker, can_open=True, active=True, position=reader.position)
+        start = reader.position
+        reader.consume(self.pattern)
+        opener = Token(BRACKET, reader.subject, start, reader.position, CAN_OPEN | ACTIVE)
+        self.parser.brackets.push(opener, len(document))
+        document += opener
         return True
 
 
 class LinkCloserProcessor(PatternInlineProcessor):
+    trigger = r'\]'
     pattern = re.compile(r'\]')
+    closing_paren_pattern = re.compile(r'\s*\)')
 
     def run(self, reader: TextReader, document: Element) -> bool:
         reader.step(1)
-        document += addnodes.bracket(marker="]", can_open=False, position=reader.position - 1)
+        document += Token(BRACKET, reader.subject, reader.position - 1, reader.position)
         self.process_link_or_image(reader, document)
         return True
 
     @backtrack_onerror
     def process_link_or_image(self, reader: TextReader, document: Element) -> bool:
-        brackets = list(n for n in document.children if isinstance(n, addnodes.bracket))
-        openers = list(d for d in brackets if d['can_open'])
-        if len(openers) == 0:
+        if len(self.parser.brackets) == 0:
             return True
 
-        opener = openers.pop()
-        closer = brackets.pop()
+        opener, opener_index = self.parser.brackets.pop()
+        closer_index = len(document) - 1
+        closer = cast(Token, document[closer_index])
 
-        if not opener['active']:
-            opener.replace_self(Text(opener['marker']))
-            closer.replace_self(Text(closer['marker']))
+        if not opener.flags & ACTIVE:
+            self.deactivate_brackets(document, opener_index, closer_index)
             return True
 
         try:
-            if reader.remain.startswith('('):
+            if reader.peek() == '(':
                 # link destination + link title (optional)
                 #     [...](<.+> ".+")
                 #     [...](.+ ".+")
                 destination, title = self.parse_link_destination(reader, document)
-            elif reader.remain.startswith('['):
+            elif reader.peek() == '[':
                 # link label
                 #     [...][.+]
                 #     [...][]
@@ -81,62 +85,65 @@ class LinkCloserProcessor(PatternInlineProcessor):
         if destination is None:
             # shortcut reference link
             #    [...]
-            refid = reader[opener['position']:closer['position']]
+            refid = reader[opener.end:closer.start]
             target = self.lookup_target(document, refid)
             if target:
                 destination = target.get('refuri')
                 title = target.get('title')
             else:
                 # deactivate brackets because no trailing link destination or link-label
-                opener.replace_self(Text(opener['marker']))
-                closer.replace_self(Text(closer['marker']))
+                self.deactivate_brackets(document, opener_index, closer_index)
                 raise
         elif destination == LABEL_NOT_MATCHED:
-            opener.replace_self(Text(opener['marker']))
-            closer.replace_self(Text(closer['marker']))
+            self.deactivate_brackets(document, opener_index, closer_index)
             raise
 
+        # take the nodes between brackets out, and remove brackets
+        children = document.children[opener_index + 1:closer_index]
+        del document.children[opener_index:]
+
         node: Element = None
-        if opener['marker'] == '![':
-            from pycmark.transforms import EmphasisConverter  # lazy loading
-            para = transplant_nodes(document, nodes.paragraph(), start=opener, end=closer)
-            EmphasisConverter(para).apply()
+        if str(opener) == '![':
+            para = nodes.paragraph()
+            para.extend(children)
+            resolve_tokens(para)
             node = nodes.image('', uri=destination, alt=para.astext())
             if title:
                 node['title'] = title
         else:
             node = nodes.reference('', refuri=destination)
-            transplant_nodes(document, node, start=opener, end=closer)
+            node.extend(children)
             if title:
                 node['reftitle'] = title
 
             # deactivate all left brackets before the link
-            for n in openers:
-                if n['marker'] == '[':
-                    n['active'] = False
+            self.parser.brackets.deactivate_links()
 
         document += node
-        document.remove(opener)
-        document.remove(closer)
         return True
 
+    def deactivate_brackets(self, document: Element, opener_index: int, closer_index: int) -> None:
+        """Replaces a pair of brackets by texts."""
+        document[opener_index] = Text(str(document[opener_index]))
+        document[closer_index] = Text(str(document[closer_index]))
+
     @backtrack_onerror
     def parse_link_destination(self, reader: TextReader, document: Element) -> Tuple[str, str]:
         reader.step()
         destination = LinkDestinationParser().parse(reader, document)
         title = LinkTitleParser().parse(reader, document)
-        assert reader.consume(re.compile(r'\s*\)'))
+        assert reader.consume(self.closing_paren_pattern)
 
         return destination, title
 
     @backtrack_onerror
-    def parse_link_label(self, reader: TextReader, document: Element, opener: Element = None, closer: Element = None) -> Tuple[object, str]:  # NOQA
+    def parse_link_label(self, reader: TextReader, document: Element, opener: Token = None, closer: Token = None) -> Tuple[object, str]:  # NOQA
         reader.step()
         refname = LinkLabelParser().parse(reader, document)
         if refname == '':
             # collapsed reference link
             #     [...][]
-            refname = reader[opener['position']:closer['position']]
+            refname = reader[opener.end:closer.start]
 
         target = self.lookup_target(document, refname)
         if target:
@@ -150,8 +157,10 @@ class LinkCloserProcessor(PatternInlineProcessor):
         document = get_root_document(node)
 
         refname = normalize_link_label(refname)
+        self.parser.referenced_labels.add(refname)
         node_id = document.nameids.get(refname)
         if node_id is None:
+            self.parser.undefined_labels.add(refname)
             return None
 
         return document.ids.get(node_id)
@@ -159,9 +168,11 @@ class LinkCloserProcessor(PatternInlineProcessor):
 
 class LinkDestinationParser:
     pattern = re.compile(r'\s*<((?:[^<>\n\\]|' + ESCAPED_CHARS + r')*)>', re.S)
+    opening_pattern = re.compile(r'\s*<')
+    leading_spaces_pattern = re.compile(r'[ \n]*')
 
     def parse(self, reader: TextReader, document: Element) -> str:
-        if re.match(r'^\s*<', reader.remain):
+        if reader.match(self.opening_pattern):
             matched = reader.consume(self.pattern)
             if not matched:
                 return ''
@@ -177,15 +188,15 @@ class LinkDestinationParser:
         return s
 
     def parseBareLinkDestination(self, reader: TextReader, document: Element) -> str:
-        assert reader.consume(re.compile(r'[ \n]*'))
+        assert reader.consume(self.leading_spaces_pattern)
 
-        if reader.remain == '':  # must be empty line!
+        if reader.at_end:  # must be empty line!
             return None
 
         parens = 0
         start = reader.position
-        while reader.remain:
-            c = reader.remain[0]
+        while not reader.at_end:
+            c = reader.peek()
             if c in (' ', '\n'):
                 break
             elif c == '(':
@@ -194,7 +205,7 @@ class LinkDestinationParser:
                 parens -= 1
                 if parens < 0:
                     break
-            elif escaped_chars_pattern.match(reader.remain):
+            elif reader.match(escaped_chars_pattern):
                 reader.step()  # one more step for escaping
 
             reader.step()
@@ -10,13 +10,15 @@
 
 import re
 import unicodedata
-from typing import Any
+from bisect import bisect_left
+from typing import Any, Dict, List
 
 from docutils import nodes
 from docutils.nodes import Element, Text
 
 from pycmark import addnodes
-from pycmark.inlineparser import PatternInlineProcessor, UnmatchedTokenError, backtrack_onerror
+from pycmark.inlineparser import InlineParser, PatternInlineProcessor, UnmatchedTokenError, backtrack_onerror
+from pycmark.inlineparser.tokens import CAN_CLOSE, CAN_OPEN, EMPHASIS, INTERIOR, TEXT, Token
 from pycmark.readers import TextReader
 from pycmark.utils import entitytrans, normalize_uri
 from pycmark.utils import OPENTAG, CLOSETAG, escaped_chars_pattern
@@ -28,16 +30,18 @@ def is_punctuation(char: str) -> bool:
 
 # 6.1 Backslash escapes
 class BackslashEscapeProcessor(PatternInlineProcessor):
+    trigger = r'\\'
     pattern = escaped_chars_pattern
 
     def run(self, reader: TextReader, document: Element) -> bool:
-        document += addnodes.SparseText(reader.subject, reader.position + 1, reader.position + 2)
+        document += Token(TEXT, reader.subject, reader.position + 1, reader.position + 2)
         reader.step(2)
         return True
 
 
 # 6.2 Entity and numeric character references
 class EntityReferenceProcessor(PatternInlineProcessor):
+    trigger = '&'
     pattern = re.compile(r'&(?:\w{1,32}|#\d{1,7}|#[xX][0-9A-Fa-f]{1,6});')
 
     def run(self, reader: TextReader, document: Element) -> bool:
@@ -48,30 +52,43 @@ class EntityReferenceProcessor(PatternInlineProcessor):
 
 # 6.3 Code spans
 class CodeSpanProcessor(PatternInlineProcessor):
+    trigger = '`'
     pattern = re.compile(r'`+')
 
+    def __init__(self, parser: InlineParser) -> None:
+        super().__init__(parser)
+        self.subject: str = None
+        self.backtick_runs: Dict[int, List[int]] = {}
+
     @backtrack_onerror
     def run(self, reader: TextReader, document: Element) -> bool:
         marker = reader.consume(self.pattern).group(0)
+        closer = self.find_closer(reader.subject, reader.position, len(marker))
+        if closer is None:
+            raise UnmatchedTokenError(marker)
+
+        code = re.sub(r'[\r\n]', ' ', reader[reader.position:closer], re.S)
+        code = self.trim_single_space(code)
+        document += nodes.literal(code, code)
+        reader.position = closer + len(marker)
+        return True
 
-        pattern = re.compile(marker + r"([^`]|$)")
-        text = addnodes.SparseText(reader.remain, 0, 0)
-        while reader.remain:
-            if pattern.match(reader.remain):
-                code = re.sub(r'[\r\n]', ' ', str(text), re.S)
-                code = self.trim_single_space(code)
-                document += nodes.literal(code, code)
-                reader.step(len(marker))
-                return True
-            elif reader.remain[0] == '`':
-                while reader.remain and reader.remain[0] == '`':
-                    text.spread(end=1)
-                    reader.step()
-            else:
-                text.spread(end=1)
-                reader.step()
+    def find_closer(self, subject: str, position: int, length: int) -> int:
+        """Returns the position of the backtick run having the same length after the position."""
+        if self.subject is not subject:
+            # build an index of backtick runs once per text
+            self.subject = subject
+            self.backtick_runs = {}
+            for matched in self.pattern.finditer(subject):
+                run_length = matched.end() - matched.start()
+                self.backtick_runs.setdefault(run_length, []).append(matched.start())
+
+        runs = self.backtick_runs.get(length, [])
+        index = bisect_left(runs, position)
+        if index < len(runs):
+            return runs[index]
         else:
-            raise UnmatchedTokenError(marker)
+            return None
 
     def trim_single_space(self, s: str) -> str:
         return re.sub('^ (.+) $', r'\1', s)
@@ -79,6 +96,7 @@ class CodeSpanProcessor(PatternInlineProcessor):
 
 # 6.4 Emphasis and strong emphasis
 class EmphasisProcessor(PatternInlineProcessor):
+    trigger = r'[*_]'
     pattern = re.compile(r'(\*+|_+)')
     whitespaces = re.compile(r'\s|0xa0')
 
@@ -88,14 +106,15 @@ class EmphasisProcessor(PatternInlineProcessor):
             before_is_punctuation: Any = False
         else:
             before = reader[reader.position - 1]
-            before_is_whitespace = self.whitespaces.match(before)
+            before_is_whitespace = bool(self.whitespaces.match(before))
             before_is_punctuation = is_punctuation(before)
 
-        marker = reader.consume(self.pattern).group(0)
+        start = reader.position
+        reader.consume(self.pattern)
 
-        if reader.remain:
-            after = reader.remain[0]
-            after_is_whitespace: Any = self.whitespaces.match(after)
+        if not reader.at_end:
+            after = reader.peek()
+            after_is_whitespace: Any = bool(self.whitespaces.match(after))
             after_is_punctuation: Any = is_punctuation(after)
         else:
             after_is_whitespace = True
@@ -110,7 +129,7 @@ class EmphasisProcessor(PatternInlineProcessor):
                            after_is_whitespace or
                            after_is_punctuation))
 
-        if marker[0] == '_':
+        if reader[start] == '_':
             can_open = (left_flanking and
                         (not right_flanking or before_is_punctuation))
             can_close = (right_flanking and
@@ -119,14 +138,20 @@ class EmphasisProcessor(PatternInlineProcessor):
             can_open = left_flanking
             can_close = right_flanking
 
-        document += addnodes.emphasis(marker=marker, can_open=can_open, can_close=can_close,
-                                      orig_length=len(marker), curr_length=len(marker),
-                                      interior=can_open and can_close)
+        flags = 0
+        if can_open:
+            flags |= CAN_OPEN
+        if can_close:
+            flags |= CAN_CLOSE
+        if can_open and can_close:
+            flags |= INTERIOR
+        document += Token(EMPHASIS, reader.subject, start, reader.position, flags)
         return True
 
 
 # 6.7 Autolinks
 class URIAutolinkProcessor(PatternInlineProcessor):
+    trigger = '<'
     pattern = re.compile(r'<([a-z][a-z0-9+.-]{1,31}:[^<>\x00-\x20]*)>', re.I)
 
     def run(self, reader: TextReader, document: Element) -> bool:
@@ -136,6 +161,7 @@ class URIAutolinkProcessor(PatternInlineProcessor):
 
 
 class EmailAutolinkProcessor(PatternInlineProcessor):
+    trigger = '<'
     pattern = re.compile(r'<([a-zA-Z0-9.!#$%&\'*+/=?^_`{|}~-]+@[a-zA-Z0-9]'
                          r'(?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?'
                          r'(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*)>')
@@ -148,6 +174,7 @@ class EmailAutolinkProcessor(PatternInlineProcessor):
 
 # 6.8 Raw HTML
 class RawHTMLProcessor(PatternInlineProcessor):
+    trigger = '<'
     HTML_COMMENT = r'<!---->|<!--(?:-?[^>-])(?:-?[^-])*-->'
     PROCESSING_INSTRUCTION = r"<\?.*?\?>"
     DECLARATION = r"<![A-Z]+" + r"\s+[^>]*>"
@@ -164,6 +191,7 @@ class RawHTMLProcessor(PatternInlineProcessor):
 
 # 6.9 Hard line breaks
 class HardLinebreakProcessor(PatternInlineProcessor):
+    trigger = r'(?: {2,}|\\)\n'
     pattern = re.compile(r'( {2,}|\\)\n')
 
     def run(self, reader: TextReader, document: Element) -> bool:
@@ -177,6 +205,7 @@ class HardLinebreakProcessor(PatternInlineProcessor):
 
 # 6.10 Soft line breaks
 class SoftLinebreakProcessor(PatternInlineProcessor):
+    trigger = r'\s(?=\n)'
     pattern = re.compile(r'\s(?=\n)')
 
     def run(self, reader: TextReader, document: Element) -> bool:
@@ -184,5 +213,5 @@ class SoftLinebreakProcessor(PatternInlineProcessor):
             return False
         else:
             reader.consume(self.pattern)  # skip over a space at tail
-            document += addnodes.SparseText(reader.subject, reader.position, reader.position)
+            document += Token(TEXT, reader.subject, reader.position, reader.position)
             return True
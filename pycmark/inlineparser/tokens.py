@@ -0,0 +1,244 @@
+"""
+    pycmark.inlineparser.tokens
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Transient markers built by the inline parser.
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+from typing import Dict, List, Tuple, cast
+
+from docutils import nodes
+from docutils.nodes import Element, Node, Text
+
+# kinds of tokens
+TEXT = 0
+EMPHASIS = 1
+BRACKET = 2
+
+# flags of tokens
+CAN_OPEN = 1
+CAN_CLOSE = 2
+INTERIOR = 4  # the emphasis marker can both open and close
+ACTIVE = 8  # the link opener is active
+
+
+class Token(Node):
+    """A transient marker in the text being parsed.
+
+    Tokens are placed into the children of the text element being parsed like
+    nodes.  But they have neither attributes nor children.  A token refers to
+    the range of the marker (or the plain text) in the parsed text.
+
+    The fields are stored in ``__slots__``.  As :class:`~docutils.nodes.Node`
+    does not define ``__slots__``, a token still has an instance ``__dict__``;
+    it is never filled (and is not allocated unless accessed), but it keeps a
+    token larger than a plain slotted object.  Tokens subclass ``Node`` so that
+    they can be appended to elements.
+
+    At the end of the inline parsing, the tokens are resolved by
+    :func:`resolve_tokens()` and replaced by real nodes.
+
+    Hard line breaks are not tokens; :class:`~pycmark.addnodes.linebreak` nodes
+    can remain in the doctree for writers.
+    """
+
+    __slots__ = ('kind', 'subject', 'start', 'end', 'flags', 'length',
+                 'parent', 'document', 'source', 'line')
+
+    def __init__(self, kind: int, subject: str, start: int, end: int, flags: int = 0) -> None:
+        self.kind = kind
+        self.subject = subject
+        self.start = start
+        self.end = end
+        self.flags = flags
+        self.length = end - start  # the original length of the marker
+        self.parent = None
+        self.document = None
+        self.source = None
+        self.line = None
+
+    def __str__(self) -> str:
+        return self.subject[self.start:self.end]
+
+    def __repr__(self) -> str:
+        return '<%s %d: %r>' % (self.__class__.__name__, self.kind, str(self))
+
+    def astext(self) -> str:
+        return str(self)
+
+    def copy(self) -> "Token":
+        token = self.__class__(self.kind, self.subject, self.start, self.end, self.flags)
+        token.length = self.length
+        token.source = self.source
+        token.line = self.line
+        return token
+
+    def deepcopy(self) -> "Token":
+        return self.copy()
+
+    def pformat(self, indent: str = '    ', level: int = 0) -> str:
+        return '%s%r\n' % (indent * level, self)
+
+    def spread(self, end: int = 1, start: int = 0) -> None:
+        self.start -= start
+        self.end += end
+
+
+def is_matching_pair(opener: Token, closer: Token) -> bool:
+    """Checks the opener can be closed by the closer or not.
+
+    The result depends on the closer only through its marker character, ``INTERIOR``
+    flag and ``length % 3``.  ``process_emphasis()`` relies on it.
+    """
+    if not opener.flags & CAN_OPEN:
+        return False
+    elif opener.subject[opener.start] != closer.subject[closer.start]:
+        return False
+    elif (opener.flags & INTERIOR and opener.length % 3 == 0 and
+          closer.flags & INTERIOR and closer.length % 3 == 0):
+        return True
+    else:
+        odd_match = ((closer.flags & INTERIOR or opener.flags & INTERIOR) and
+                     (opener.length + closer.length) % 3 == 0)
+        return not odd_match
+
+
+def process_emphasis(children: List[Node]) -> List[Node]:
+    """Converts the pairs of emphasis markers in the children to emphasis and strong nodes.
+
+    Returns the new children; the markers not paired are left as they are.
+
+    This follows the "process emphasis" procedure of the CommonMark spec.  The children
+    and the markers (delimiter stack) are kept as doubly linked lists, and the search
+    for an opener never goes below the point where an earlier search has already failed
+    for the same kind of closer.  So the whole procedure runs in linear time.
+    """
+    def is_emphasis(node: Node) -> bool:
+        return isinstance(node, Token) and node.kind == EMPHASIS
+
+    # children of the node as a doubly linked list (0 and -1 are sentinels)
+    items: List[Node] = [None] + children + [None]
+    prev_item = list(range(-1, len(items) - 1))
+    next_item = list(range(1, len(items) + 1))
+    head = 0
+    tail = len(items) - 1
+
+    # delimiter stack as a doubly linked list
+    delimiters = [i for i, n in enumerate(items) if is_emphasis(n)]
+    prev_delim: Dict[int, int] = dict(zip(delimiters, [None] + delimiters[:-1]))
+    next_delim: Dict[int, int] = dict(zip(delimiters, delimiters[1:] + [None]))
+
+    def unlink(i: int) -> None:
+        next_item[prev_item[i]] = next_item[i]
+        prev_item[next_item[i]] = prev_item[i]
+
+    def unlink_delimiter(i: int) -> None:
+        if prev_delim[i] is not None:
+            next_delim[prev_delim[i]] = next_delim[i]
+        if next_delim[i] is not None:
+            prev_delim[next_delim[i]] = prev_delim[i]
+
+    openers_bottom: Dict[Tuple[str, int, int], int] = {}
+    closer = delimiters[0] if delimiters else None
+    while closer is not None:
+        closer_token = cast(Token, items[closer])
+        if not closer_token.flags & CAN_CLOSE:
+            closer = next_delim[closer]
+            continue
+
+        # look for the nearest matching opener
+        key = (closer_token.subject[closer_token.start], closer_token.flags & INTERIOR, closer_token.length % 3)
+        bottom = openers_bottom.get(key, head)
+        opener = prev_delim[closer]
+        while opener is not None and opener > bottom:
+            if is_matching_pair(cast(Token, items[opener]), closer_token):
+                break
+            opener = prev_delim[opener]
+        else:
+            opener = None
+
+        if opener is None:
+            # Following closers of the same kind never match below here
+            if prev_delim[closer] is None:
+                openers_bottom[key] = head
+            else:
+                openers_bottom[key] = prev_delim[closer]
+            closer_token.flags &= ~CAN_CLOSE
+            next_closer = next_delim[closer]
+            if not closer_token.flags & CAN_OPEN:
+                unlink_delimiter(closer)
+            closer = next_closer
+            continue
+
+        opener_token = cast(Token, items[opener])
+        if opener_token.end - opener_token.start >= 2 and closer_token.end - closer_token.start >= 2:
+            length = 2
+            emph_node: Element = nodes.strong()
+        else:
+            length = 1
+            emph_node = nodes.emphasis()
+
+        # move nodes between the opener and the closer into the emphasis node
+        children = []
+        i = next_item[opener]
+        while i != closer:
+            children.append(items[i])
+            i = next_item[i]
+        emph_node.children = children
+        for child in children:
+            child.parent = emph_node
+
+        items.append(emph_node)
+        prev_item.append(opener)
+        next_item.append(closer)
+        next_item[opener] = prev_item[closer] = len(items) - 1
+        next_delim[opener] = closer
+        prev_delim[closer] = opener
+
+        opener_token.end -= length
+        if opener_token.end == opener_token.start:
+            unlink(opener)
+            unlink_delimiter(opener)
+
+        closer_token.end -= length
+        if closer_token.end == closer_token.start:
+            unlink(closer)
+            unlink_delimiter(closer)
+            closer = next_delim[closer]
+
+    children = []
+    i = next_item[head]
+    while i != tail:
+        children.append(items[i])
+        i = next_item[i]
+
+    return children
+
+
+def resolve_tokens(node: Element) -> None:
+    """Replaces the tokens in the node (and its descendants) by nodes.
+
+    The pairs of emphasis markers are converted to emphasis and strong nodes, and
+    the rest of tokens are converted to texts.  Adjacent texts are joined.
+    """
+    children = node.children
+    if any(isinstance(child, Token) and child.kind == EMPHASIS for child in children):
+        children = process_emphasis(children)
+
+    node.children = []
+    texts: List[str] = []
+    for child in children + [None]:
+        if isinstance(child, (Token, Text)):
+            texts.append(str(child))
+            continue
+        elif texts:
+            node.append(Text(''.join(texts)))
+            texts = []
+
+        if child is not None:
+            if isinstance(child, Element):
+                resolve_tokens(child)
+            node.append(child)
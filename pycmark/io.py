@@ -0,0 +1,53 @@
+"""
+    pycmark.io
+    ~~~~~~~~~~
+
+    Input classes for docutils.
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+import codecs
+import mmap
+import os
+
+from docutils import io
+
+from pycmark.readers import LineBuffer
+
+
+def is_utf8(encoding: str) -> bool:
+    """Checks the encoding is UTF-8 or not."""
+    try:
+        return codecs.lookup(encoding).name in ('utf-8', 'utf-8-sig')
+    except (LookupError, TypeError):
+        return False
+
+
+class MappedFileInput(io.Input):
+    """An input maps a UTF-8 encoded file onto memory.
+
+    Unlike other inputs, :meth:`read()` returns a :class:`~pycmark.readers.LineBuffer`
+    instead of the decoded text.  Therefore it can be used only with
+    :class:`pycmark.Parser`.
+
+    The file is decoded with the ``input_encoding`` and ``input_encoding_error_handler``
+    settings.  If the encoding is not UTF-8 (or not given), the file is read and
+    decoded at once like :class:`docutils.io.FileInput`.
+
+    The file is closed after mapping.  The mapping is closed by the parser after
+    parsing (see :meth:`pycmark.readers.LineBuffer.close()`).
+    """
+
+    default_source_path = '<mmap>'
+
+    def read(self) -> LineBuffer:  # type: ignore
+        with open(self.source_path, 'rb') as f:
+            if not is_utf8(self.encoding):
+                return LineBuffer(self.decode(f.read()))
+            elif os.fstat(f.fileno()).st_size == 0:
+                return LineBuffer(b'')  # an empty file can't be mapped
+            else:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                return LineBuffer(mapped, self.error_handler or 'strict')
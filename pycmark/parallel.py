@@ -0,0 +1,336 @@
+"""
+    pycmark.parallel
+    ~~~~~~~~~~~~~~~~
+
+    Parsing in parallel processes.
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TYPE_CHECKING, Tuple, Type, Union, cast
+
+from docutils import nodes
+from docutils.nodes import Element, Node, Text, TextElement
+from docutils.utils import Reporter, new_document
+
+from pycmark import addnodes
+from pycmark.blockparser import BlockParser, BlockProcessor
+from pycmark.inlineparser import InlineParser, InlineProcessor
+from pycmark.readers import StreamLineReader
+from pycmark.streaming import is_text_container
+from pycmark.transforms import InlineTransform
+from pycmark.utils import collect_messages, note_targets, report_again
+
+if TYPE_CHECKING:
+    from pycmark import Parser
+
+#: A compact form of a node built by the inline parser: a string for a Text node,
+#: or a tuple of the class, the instance variables and the children for other nodes.
+EncodedNode = Union[str, Tuple[Type[Element], Dict[str, Any], List[Any]]]
+
+#: the destination and the title of a link reference definition
+Definition = Tuple[Optional[str], Optional[str]]
+
+#: A top-level block: the line number it starts at (0 origin), its nodes and
+#: the messages reported on parsing it
+Block = Tuple[int, List[Node], List[nodes.system_message]]
+
+#: inline parsers of the worker process (for each list of processors)
+worker_parsers: Dict[Tuple[Type[InlineProcessor], ...], InlineParser] = {}
+
+#: block parsers of the worker process (for each list of processors)
+worker_block_parsers: Dict[Tuple[Type[BlockProcessor], ...], BlockParser] = {}
+
+
+def encode_nodes(node: Element) -> List[EncodedNode]:
+    """Encodes the children of the node."""
+    excludes = ('_document', 'children', 'document', 'parent')
+    encoded: List[EncodedNode] = []
+    for child in node.children:
+        if isinstance(child, Text):
+            encoded.append(str(child))
+        else:
+            element = cast(Element, child)
+            state = {name: value for name, value in vars(element).items() if name not in excludes}
+            encoded.append((element.__class__, state, encode_nodes(element)))
+
+    return encoded
+
+
+def decode_nodes(encoded: List[EncodedNode]) -> List[Node]:
+    """Decodes the encoded nodes."""
+    children: List[Node] = []
+    for item in encoded:
+        if isinstance(item, str):
+            children.append(Text(item))
+        else:
+            cls, state, subitems = item
+            node = cls.__new__(cls)
+            node.__dict__.update(state)
+            node.children = []
+            node.extend(decode_nodes(subitems))
+            children.append(node)
+
+    return children
+
+
+def parse_inline_texts(processors: List[Type[InlineProcessor]], definitions: Dict[str, Definition],
+                       texts: List[Tuple[Type[TextElement], str]]) -> List[List[EncodedNode]]:
+    """Parses the texts of text elements, and returns the nodes built for each of them (encoded).
+
+    This runs in the worker processes.  *definitions* are the link reference
+    definitions of the document.
+    """
+    key = tuple(processors)
+    if key not in worker_parsers:
+        parser = InlineParser()
+        parser.add_processors(processor(parser) for processor in processors)
+        worker_parsers[key] = parser
+
+    # a document holding the definitions for the lookup of link labels
+    document = nodes.document(None, None)
+    for label, (refuri, title) in definitions.items():
+        target = nodes.target('', names=[label], refuri=refuri)
+        if title:
+            target['title'] = title
+        document.nameids[label] = label
+        document.ids[label] = target
+
+    results = []
+    for cls, text in texts:
+        node = cls()
+        node += Text(text)
+        document += node
+        worker_parsers[key].parse(node)
+        results.append(encode_nodes(node))
+        document.remove(node)
+
+    return results
+
+
+class ParallelInlineTransform(InlineTransform):
+    """Parses inline elements in worker processes.
+
+    The inline parsing of a text element does not depend on others, except the
+    link reference definitions of the document.  So the texts are sent to a pool
+    of ``inline_workers`` processes with the definitions, and the nodes built are
+    sent back in a compact form (see :func:`encode_nodes()`) and grafted to the text
+    elements in document order.  The doctree is the same as the serial parsing.
+
+    Documents whose texts are shorter than ``inline_workers_threshold``
+    characters are parsed serially, because the cost of sending the texts
+    outweighs.  It is enabled by ``Parser.inline_workers``.  The pool of the
+    parser is used (see :meth:`pycmark.Parser.get_executor()`).
+    """
+
+    #: the number of chunks to split the texts into per worker
+    chunks_per_worker = 4
+
+    def apply(self, **kwargs) -> None:
+        workers = getattr(self.document.settings, 'inline_workers', 0)
+        threshold = getattr(self.document.settings, 'inline_workers_threshold', 0)
+        parser = self.document.transformer.components.get('parser')
+        get_executor = getattr(parser, 'get_executor', None)
+        containers = cast(Iterator[TextElement], self.document.findall(is_text_container))
+        targets = [node for node in containers if len(node) > 0]
+        texts = [(node.__class__, str(node[-1])) for node in targets]
+        if workers <= 1 or get_executor is None or sum(len(text) for _, text in texts) < threshold:
+            super().apply(**kwargs)
+            return
+
+        definitions = {label: (self.document.ids[node_id].get('refuri'), self.document.ids[node_id].get('title'))
+                       for label, node_id in self.document.nameids.items() if node_id in self.document.ids}
+        size = max(len(texts) // (workers * self.chunks_per_worker), 1)
+        chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+        processors = self.document.settings.inline_processors
+        results = get_executor().map(parse_inline_texts, [processors] * len(chunks),
+                                     [definitions] * len(chunks), chunks)
+        offset = 0
+        for encoded_list in results:
+            for encoded in encoded_list:
+                node = targets[offset]
+                node.pop()
+                node.extend(decode_nodes(encoded))
+                offset += 1
+
+
+def new_scratch_document(source_path: str) -> nodes.document:
+    """Creates a document to parse blocks into temporarily.
+
+    Its warnings are suppressed; they are collected for each block, and reported
+    on the document the blocks go.
+    """
+    document = new_document(source_path)
+    document.reporter.report_level = Reporter.SEVERE_LEVEL + 1  # type: ignore
+    return document
+
+
+def is_blank_block(block: Block) -> bool:
+    return all(isinstance(node, addnodes.blankline) for node in block[1])
+
+
+def parse_block_chunk(processors: List[Type[BlockProcessor]], source_path: str,
+                      lineno: int, lines: List[str]) -> List[Block]:
+    """Parses the lines starting at the line *lineno*, and returns the top-level blocks.
+
+    This runs in the worker processes.
+    """
+    key = tuple(processors)
+    if key not in worker_block_parsers:
+        parser = BlockParser()
+        parser.add_processors(processor(parser) for processor in processors)
+        worker_block_parsers[key] = parser
+
+    document = new_scratch_document(source_path)
+    reader = StreamLineReader(lines, source_path, lineno)
+    blocks = []
+    while not reader.eof():
+        start = reader.lineno
+        reader.discard()
+        with collect_messages(document.reporter) as messages:
+            worker_block_parsers[key].parse_block(reader, document)
+        blocks.append((start, document.children[:], messages))
+        del document.children[:]
+
+    # detach the nodes from the document not to be sent together
+    for _, children, _ in blocks:
+        for node in children:
+            node.parent = None
+            for subnode in node.findall():
+                subnode.document = None
+
+    return blocks
+
+
+class ParallelBlockParser:
+    """Parses blocks of a large document in worker processes.
+
+    The lines are split into chunks at the lines following a blank line which
+    look like starting a top-level block (see :meth:`is_boundary_candidate()`),
+    and each chunk is parsed by a pool of *workers* processes.  Some of these
+    boundaries may be wrong: a fenced code block or an HTML block can contain
+    blank lines, and so can a list or an indented code block if the line is
+    indented.  So, on joining the chunks, the blocks are parsed again from the
+    last non-blank block of each chunk until the boundaries of blocks match the
+    blocks of the following chunks.  The result is the same as the serial
+    parsing.  Usually, only a block is parsed again for each chunk.  The pool
+    of the parser is used (see :meth:`pycmark.Parser.get_executor()`).
+
+    The blocks parsed by workers start at the correct line numbers.  The
+    sections and the link reference definitions are registered to the document
+    after all chunks are joined, before the inline parsing.  The messages
+    reported by workers are sent back with each block, and reported on the
+    document at the line the block starts.  It is enabled by
+    ``Parser.block_workers``.
+    """
+
+    #: the number of chunks to split the lines into per worker
+    chunks_per_worker = 4
+
+    def __init__(self, parser: "Parser", workers: int) -> None:
+        self.parser = parser
+        self.workers = workers
+
+    def parse(self, lines: Sequence[str], document: nodes.document) -> None:
+        source_path = document['source']
+        boundaries = self.split(lines)
+        ends = boundaries[1:] + [len(lines)]
+        chunks = [list(lines[start:end]) for start, end in zip(boundaries, ends)]
+        processors = self.parser.get_block_processors()
+        results = list(self.parser.get_executor().map(parse_block_chunk, [processors] * len(chunks),
+                                                      [source_path] * len(chunks), boundaries, chunks))
+
+        blocks = self.join(lines, source_path, results)
+        block_lines = {}  # the line numbers (1 origin) of the top-level nodes
+        for start, children, _ in blocks:
+            document.extend(children)
+            for node in children:
+                block_lines[id(node)] = start + 1
+        for node in document.findall():
+            node.document = document
+
+        # report the messages of workers at the blocks
+        reported: Dict[str, int] = Counter()
+        for start, _, messages in blocks:
+            for message in messages:
+                message['source'] = source_path
+                if message.get('line') is None:
+                    message['line'] = start + 1
+                reported[message[0].astext()] += 1
+                report_again(document.reporter, message)
+
+        # the duplicated targets across chunks (the others have been reported by workers)
+        for target in note_targets(document):
+            text = 'Duplicate explicit target name: "%s"' % target['names'][0]
+            if reported[text] > 0:
+                reported[text] -= 1
+            else:
+                node = target
+                while node.parent is not document:
+                    node = node.parent
+                document.reporter.warning(text, source=source_path, line=block_lines[id(node)])
+
+    def split(self, lines: Sequence[str]) -> List[int]:
+        """Returns the line numbers to split the lines at (the first one is 0)."""
+        size = max(len(lines) // (self.workers * self.chunks_per_worker), 1)
+        boundaries = [0]
+        lineno = size
+        while lineno < len(lines):
+            if self.is_boundary_candidate(lines, lineno):
+                boundaries.append(lineno)
+                lineno += size
+            else:
+                lineno += 1
+
+        return boundaries
+
+    def is_boundary_candidate(self, lines: Sequence[str], lineno: int) -> bool:
+        """Checks the line follows a blank line, and starts with a character which
+        can not start or continue lists, block quotes, code blocks and HTML blocks.
+        """
+        first_char = lines[lineno][:1]
+        return (lines[lineno - 1].strip() == '' and
+                (first_char.isalpha() or first_char in '#['))
+
+    def join(self, lines: Sequence[str], source_path: str, results: List[List[Block]]) -> List[Block]:
+        """Joins the blocks of chunks, and returns them."""
+        parsed = [block for blocks in results for block in blocks]
+        positions = {start: i for i, (start, _, _) in enumerate(parsed)}
+        last_blocks = set()  # the positions of the last blocks of chunks (may continue to the next chunk)
+        for blocks in results[:-1]:
+            last_blocks.add(positions[blocks[-1][0]])
+
+        document = new_scratch_document(source_path)
+        joined: List[Block] = []
+        position = 0
+        while position < len(parsed):
+            joined.append(parsed[position])
+            if position not in last_blocks:
+                position += 1
+                continue
+
+            # parse again from the last non-blank block
+            index = len(joined) - 1
+            while index > 0 and is_blank_block(joined[index]):
+                index -= 1
+            start = joined[index][0]
+            del joined[index:]
+
+            last = position
+            position = len(parsed)
+            reader = StreamLineReader((lines[i] for i in range(start, len(lines))), source_path, start)
+            while not reader.eof():
+                lineno = reader.lineno
+                reader.discard()
+                with collect_messages(document.reporter) as messages:
+                    self.parser.block_parser.parse_block(reader, document)
+                joined.append((lineno, document.children[:], messages))
+                del document.children[:]
+
+                if positions.get(reader.lineno, -1) > last:
+                    position = positions[reader.lineno]  # re-synchronized
+                    break
+
+        return joined
@@ -9,7 +9,12 @@
 """
 
 import re
-from typing import List, Match, NamedTuple, Pattern, TYPE_CHECKING, Tuple, Union
+from array import array
+from collections.abc import Sequence as SequenceBase
+from itertools import accumulate
+from typing import (
+    Any, Dict, Iterable, List, Match, NamedTuple, Optional, Pattern, Sequence, TYPE_CHECKING, Tuple, Union, cast
+)
 
 from docutils.nodes import Node
 
@@ -28,11 +33,157 @@ class SourceInfo(SourceInfoBase):
         node.line = self.lineno
 
 
+def get_first_char(line: str) -> str:
+    """Returns the first non-space character of the line (``\\n`` for blank lines)."""
+    return (line.lstrip() or '\n')[0]
+
+
+def get_indent(line: str, tabstop: int = 4) -> int:
+    """Returns the width of indentation of the line (tabs are expanded)."""
+    indent = line[:len(line) - len(line.lstrip(' \t'))]
+    if '\t' in indent:
+        return len(indent.expandtabs(tabstop))
+    else:
+        return len(indent)
+
+
+class LineBuffer(SequenceBase):
+    """A sequence of lines backed by a single source text.
+
+    Only the offsets of lines are built at first, and line strings are
+    materialised on demand.  The source is a string or a UTF-8 encoded
+    bytes-like object (e.g. a memory-mapped file).  *errors* is the error
+    handler to decode the lines of the latter.
+
+    Lines are split at the line endings of CommonMark (LF, CR and CRLF) only,
+    and the line endings are normalized to LF.
+    """
+
+    line_endings = re.compile(r'\r\n?|\n')
+    binary_line_endings = re.compile(br'\r\n?|\n')
+
+    def __init__(self, source: Union[str, bytes, memoryview, Any], errors: str = 'strict') -> None:
+        self.source = source
+        self.errors = errors
+        line_endings: Iterable[Match[Any]]
+        if isinstance(source, str):
+            start = 0
+            line_endings = self.line_endings.finditer(source)
+        else:
+            start = 3 if source[:3] == b'\xef\xbb\xbf' else 0  # skip BOM
+            line_endings = self.binary_line_endings.finditer(source, start)
+
+        #: offsets of lines in the source (the last one is the end of the source)
+        self.offsets = array('Q', [start])
+        self.offsets.extend(matched.end() for matched in line_endings)
+        if self.offsets[-1] < len(source):
+            self.offsets.append(len(source))
+
+        self.cached_index: int = None
+        self.cached_line: str = None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[str, List[str]]:  # type: ignore
+        if isinstance(key, slice):
+            return [cast(str, self[i]) for i in range(*key.indices(len(self)))]
+
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError('line index out of range')
+
+        if key != self.cached_index:
+            line = self.source[self.offsets[key]:self.offsets[key + 1]]
+            if not isinstance(line, str):
+                line = str(line, 'utf-8', self.errors)
+
+            if line.endswith('\r\n'):
+                line = line[:-2] + '\n'
+            elif line.endswith('\r'):
+                line = line[:-1] + '\n'
+
+            self.cached_index = key
+            self.cached_line = line
+
+        return self.cached_line
+
+    def close(self) -> None:
+        """Closes the source if it can be closed (e.g. a memory-mapped file).
+
+        The lines are not available after closing.
+        """
+        if hasattr(self.source, 'close'):
+            self.source.close()
+
+
+class LineIndex:
+    """A compact index of the metadata of lines.
+
+    This is built once per document, and allows processors to consult the
+    metadata of lines without touching the strings.
+    """
+
+    #: the line consists of whitespaces only
+    BLANK = 1
+    #: the line contains tabs
+    HAS_TAB = 2
+
+    leading_spaces = re.compile(r'([ \t]*)\s*')
+
+    def __init__(self, lines: Sequence[str], tabstop: int = 4) -> None:
+        #: offsets of lines in the source (the last one is the end of the source)
+        if isinstance(lines, LineBuffer):
+            self.offsets = lines.offsets
+        else:
+            self.offsets = array('Q', [0])
+            self.offsets.extend(accumulate(map(len, lines)))
+        #: the width of indentation of lines (tabs are expanded)
+        self.indents = array('L')
+        #: flags of lines
+        self.flags = array('B')
+        #: the document contains tabs or not
+        self.has_tabs = False
+
+        first_chars = []
+        for line in lines:
+            matched = self.leading_spaces.match(line)
+            indent = matched.group(1)
+            flags = 0
+            if '\t' in line:
+                flags |= self.HAS_TAB
+                self.has_tabs = True
+                self.indents.append(len(indent.expandtabs(tabstop)))
+            else:
+                self.indents.append(len(indent))
+
+            if matched.end() == len(line):
+                flags |= self.BLANK
+                first_chars.append('\n')
+            else:
+                first_chars.append(line[matched.end()])
+            self.flags.append(flags)
+
+        #: the first non-space character of lines (``\\n`` for blank lines)
+        self.first_chars = ''.join(first_chars)
+
+    def __len__(self) -> int:
+        return len(self.flags)
+
+
 class LineReader:
-    """A line based reader for text."""
+    """A line based reader for text.
 
-    def __init__(self, lines: List[str], source: str = None, lineno: int = 0) -> None:
+    :meth:`fetch()`, :meth:`readline()` and the properties for lines raise
+    IOError when no line is available (the end of the text, or the line is not
+    a part of the container).  :meth:`try_fetch()` returns None instead for
+    the hot path.
+    """
+
+    def __init__(self, lines: Sequence[str], source: str = None, lineno: int = 0) -> None:
         self.lines = lines
+        self.index = LineIndex(lines)
         self.source = source
         self.lineno = lineno  # lineno is 1 origin
 
@@ -46,10 +197,17 @@ class LineReader:
 
     def __next__(self) -> str:
         """Returns a next line from buffer. same as :meth:`readline()`."""
-        try:
-            return self.readline()
-        except IOError:
+        line = self.try_fetch(1)
+        if line is None:
             raise StopIteration
+        else:
+            self.step()
+            return line
+
+    @property
+    def has_tabs(self) -> bool:
+        """Returns the text contains tabs or not."""
+        return self.index.has_tabs
 
     def get_source_and_line(self, incr: int = 0) -> SourceInfo:
         """Returns source filename and current line number."""
@@ -57,20 +215,69 @@ class LineReader:
 
     def fetch(self, relative: int = 0, **kwargs) -> str:
         """Returns an arbitrary line without moving the current line."""
-        try:
-            line = self.lines[self.lineno + relative - 1]
-            return expand_leading_tabs(line, kwargs.get('markers', []))
-        except IndexError:
+        line = self.try_fetch(relative, **kwargs)
+        if line is None:
             raise IOError
+        else:
+            return line
+
+    def try_fetch(self, relative: int = 0, **kwargs) -> Optional[str]:
+        """Returns an arbitrary line without moving the current line.
+
+        Unlike :meth:`fetch()`, this returns None if no line is available.
+        """
+        index = self.lineno + relative - 1
+        if -len(self.lines) <= index < len(self.lines):
+            if self.index.flags[index] & LineIndex.HAS_TAB:
+                return expand_leading_tabs(self.lines[index], kwargs.get('markers', ()))
+            else:
+                return self.lines[index]
+        else:
+            return None
+
+    def locate(self, relative: int) -> Optional[int]:
+        """Returns the position of an arbitrary line in the list of lines (or None if not exists)."""
+        index = self.lineno + relative - 1
+        if -len(self.lines) <= index < len(self.lines):
+            return index
+        else:
+            return None
+
+    def first_char(self, relative: int = 0, **kwargs) -> Optional[str]:
+        """Returns the first non-space character of an arbitrary line (``\\n`` for blank lines).
+
+        This returns None if no line is available.
+        """
+        index = self.locate(relative)
+        if index is None:
+            return None
+        else:
+            return self.index.first_chars[index]
+
+    def indent(self, relative: int = 0, **kwargs) -> Optional[int]:
+        """Returns the width of indentation of an arbitrary line.
+
+        This returns None if no line is available.
+        """
+        index = self.locate(relative)
+        if index is None:
+            return None
+        else:
+            return self.index.indents[index]
+
+    def is_blank(self, relative: int = 0, **kwargs) -> bool:
+        """Returns an arbitrary line is blank or not (False if no line is available)."""
+        index = self.locate(relative)
+        if index is None:
+            return False
+        else:
+            return bool(self.index.flags[index] & LineIndex.BLANK)
 
     def readline(self, **kwargs) -> str:
         """Reads a next line from buffer and steps the current line to next."""
-        try:
-            line = self.fetch(1, **kwargs)
-            self.step()
-            return line
-        except IndexError:
-            raise IOError
+        line = self.fetch(1, **kwargs)
+        self.step()
+        return line
 
     def eof(self, **kwargs) -> bool:
         """Returns it reaches the EOF (end of file) or not."""
@@ -91,67 +298,257 @@ class LineReader:
         self.lineno += n
 
 
+class StreamLineReader(LineReader):
+    """A line based reader for a stream of lines (e.g. a file object).
+
+    Lines are read from the stream on demand.  The lines before the current
+    line are dropped by :meth:`discard()`.  If the stream starts in the middle
+    of a text, *lineno* is the number of lines before it.
+    """
+
+    #: tabs may appear later in the stream
+    has_tabs = True
+
+    def __init__(self, lines: Iterable[str], source: str = None, lineno: int = 0) -> None:
+        self.stream = iter(lines)
+        self.lines: List[str] = []
+        self.offset = lineno  # the number of discarded lines
+        self.source = source
+        self.lineno = lineno
+
+    def __getitem__(self, key: int) -> str:
+        return self.lines[key - self.offset]
+
+    def fill(self, count: int) -> bool:
+        """Reads lines from the stream until the buffer has *count* lines.
+
+        Returns False if the stream has ended before that.
+        """
+        while len(self.lines) < count:
+            try:
+                self.lines.append(next(self.stream))
+            except StopIteration:
+                return False
+
+        return True
+
+    def discard(self) -> None:
+        """Drops the lines before the current line from the buffer."""
+        del self.lines[:self.lineno - self.offset]
+        self.offset = self.lineno
+
+    def try_fetch(self, relative: int = 0, **kwargs) -> Optional[str]:
+        index = self.lineno + relative - 1 - self.offset
+        if index < 0 or self.fill(index + 1) is False:
+            return None
+        else:
+            return expand_leading_tabs(self.lines[index], kwargs.get('markers', ()))
+
+    def first_char(self, relative: int = 0, **kwargs) -> Optional[str]:
+        line = self.try_fetch(relative)
+        if line is None:
+            return None
+        else:
+            return get_first_char(line)
+
+    def indent(self, relative: int = 0, **kwargs) -> Optional[int]:
+        line = self.try_fetch(relative)
+        if line is None:
+            return None
+        else:
+            return get_indent(line)
+
+    def is_blank(self, relative: int = 0, **kwargs) -> bool:
+        line = self.try_fetch(relative)
+        if line is None:
+            return False
+        else:
+            return line.strip() == ''
+
+    def eof(self, **kwargs) -> bool:
+        return self.fill(self.lineno - self.offset + 1) is False
+
+
 class LineReaderDecorator(LineReader):
-    """A base class of LineReader decorators."""
+    """A base class of LineReader decorators.
+
+    Decorators are stacked on a root LineReader.  The current line number is
+    managed by the root reader.
+
+    Subclasses override either :meth:`fetch()` or :meth:`try_fetch()`.
+    """
 
     def __init__(self, reader: LineReader) -> None:
         self.reader = reader
+        if isinstance(reader, LineReaderDecorator):
+            self.root: LineReader = reader.root
+        else:
+            self.root = reader
 
     def __getitem__(self, key: int) -> str:
         return self.reader[key]
 
     @property
     def lineno(self) -> int:  # type: ignore
-        return self.reader.lineno
+        return self.root.lineno
+
+    @property
+    def has_tabs(self) -> bool:
+        return self.root.has_tabs
 
     def get_source_and_line(self, incr: int = 0) -> SourceInfo:
-        return self.reader.get_source_and_line(incr)
+        return self.root.get_source_and_line(incr)
 
-    def fetch(self, relative: int = 0, **kwargs) -> str:
-        raise NotImplementedError
+    def try_fetch(self, relative: int = 0, **kwargs) -> Optional[str]:
+        # for decorators overriding fetch()
+        if type(self).fetch is LineReader.fetch:
+            # neither is overridden (LineReader.fetch() calls try_fetch())
+            raise NotImplementedError
 
-    def eof(self, **kwargs) -> bool:
-        if self.reader.eof(**kwargs):
-            return True
+        try:
+            return self.fetch(relative, **kwargs)
+        except IOError:
+            return None
+
+    def first_char(self, relative: int = 0, **kwargs) -> Optional[str]:
+        line = self.try_fetch(relative, **kwargs)
+        if line is None:
+            return None
         else:
-            try:
-                self.fetch(1, **kwargs)
-                return False
-            except IOError:
-                return True
+            return get_first_char(line)
+
+    def indent(self, relative: int = 0, **kwargs) -> Optional[int]:
+        line = self.try_fetch(relative, **kwargs)
+        if line is None:
+            return None
+        else:
+            return get_indent(line)
+
+    def is_blank(self, relative: int = 0, **kwargs) -> bool:
+        line = self.try_fetch(relative, **kwargs)
+        if line is None:
+            return False
+        else:
+            return line.strip() == ''
+
+    def eof(self, **kwargs) -> bool:
+        return self.reader.eof(**kwargs) or self.try_fetch(1, **kwargs) is None
 
     def step(self, n: int = 1) -> None:
         self.reader.step(n)
 
 
-class BlockQuoteReader(LineReaderDecorator):
+class ContainerReader(LineReaderDecorator):
+    """A base class of readers for container blocks.
+
+    Container readers are stacked on a LineReader (one reader for each level of
+    containers).  Instead of calling the underlying reader recursively,
+    :meth:`fetch()` walks down the stack of container readers, and strips the
+    prefixes of containers from the line from outermost one.  The stripped
+    lines are cached in each container reader for the current line.  Therefore
+    the cost of fetching does not grow with the depth of nesting.
+
+    Subclasses implement :meth:`get_fetch_options()` and :meth:`strip()`.
+    """
+
+    def __init__(self, reader: LineReader) -> None:
+        super().__init__(reader)
+        self.cached_lineno: int = None
+        self.cache: Dict[Tuple, str] = {}
+
+        # The markers of containers are only needed to expand tabs
+        self.markers_required = self.root.has_tabs
+
+    def try_fetch(self, relative: int = 0, **kwargs) -> Optional[str]:
+        lineno = self.root.lineno
+        pending = []
+        reader: LineReader = self
+        while True:
+            if isinstance(reader, ContainerReader):
+                if reader.cached_lineno != lineno:
+                    reader.clear_cache()
+                    reader.cached_lineno = lineno
+
+                key = get_cache_key(relative, kwargs)
+                if key in reader.cache:
+                    line = reader.cache[key]
+                    break
+                else:
+                    pending.append((reader, key, kwargs))
+                    kwargs = reader.get_fetch_options(relative, **kwargs)
+                    reader = reader.reader
+            else:
+                line = reader.try_fetch(relative, **kwargs)
+                break
+
+        for container, key, options in reversed(pending):
+            if line is not None:
+                line = container.strip(line, relative, **options)
+            container.cache[key] = line
+
+        return line
+
+    def get_fetch_options(self, relative: int, **kwargs) -> Dict[str, Any]:
+        """Returns keyword arguments to fetch a line from the underlying reader."""
+        return kwargs
+
+    def strip(self, line: str, relative: int, **kwargs) -> Optional[str]:
+        """Strips the prefix of the container from a line given by the underlying reader.
+
+        Returns None if the line is not a part of the container.
+        """
+        raise NotImplementedError
+
+    def clear_cache(self) -> None:
+        self.cached_lineno = None
+        self.cache = {}
+
+    def eof(self, **kwargs) -> bool:
+        reader: LineReader = self
+        while isinstance(reader, ContainerReader):
+            reader = reader.reader
+
+        # the line is rejected here if any of containers rejects it
+        return reader.eof(**kwargs) or self.try_fetch(1, **kwargs) is None
+
+    def step(self, n: int = 1) -> None:
+        reader: LineReader = self
+        while isinstance(reader, ContainerReader):
+            reader = reader.reader
+
+        reader.step(n)
+
+
+class BlockQuoteReader(ContainerReader):
     """A reader for block quotes."""
     pattern = re.compile('^ {0,3}> ?')
 
-    def fetch(self, relative: int = 0, **kwargs) -> str:
+    def get_fetch_options(self, relative: int, **kwargs) -> Dict[str, Any]:
+        if self.markers_required:
+            kwargs['markers'] = ['>'] + kwargs.get('markers', [])
+        return kwargs
+
+    def strip(self, line: str, relative: int, **kwargs) -> Optional[str]:
         """Returns a line without quote markers."""
-        kwargs.setdefault('markers', []).insert(0, '>')
-        line = self.reader.fetch(relative, **kwargs)
         if self.pattern.match(line):
             return self.pattern.sub('', line)
         elif kwargs.get('lazy') and line.lstrip():
             return line
         else:
-            raise IOError
+            return None
 
 
-class IndentedCodeBlockReader(LineReaderDecorator):
+class IndentedCodeBlockReader(ContainerReader):
     """A reader for indented code blocks."""
 
-    def fetch(self, relative: int = 0, **kwargs) -> str:
+    def strip(self, line: str, relative: int, **kwargs) -> Optional[str]:
         """Returns a line without indents."""
-        line = self.reader.fetch(relative, **kwargs)
         if line.startswith('    '):
             return line[4:]
         elif line.strip() == '':
             return '\n'
         else:
-            raise IOError
+            return None
 
 
 class FencedCodeBlockReader(LineReaderDecorator):
@@ -162,12 +559,14 @@ class FencedCodeBlockReader(LineReaderDecorator):
         self.closing_pattern = re.compile(r'^ {0,3}%s+\s*$' % marker)
         self.indent_pattern = re.compile(r'^ {0,%d}' % indent)
 
-    def fetch(self, relative: int = 0, **kwargs) -> str:
+    def try_fetch(self, relative: int = 0, **kwargs) -> Optional[str]:
         """Returns a line without indents."""
-        line = self.reader.fetch(relative, **kwargs)
-        if self.closing_pattern.match(line):
+        line = self.reader.try_fetch(relative, **kwargs)
+        if line is None:
+            return None
+        elif self.closing_pattern.match(line):
             self.reader.step()
-            raise IOError
+            return None
         else:
             return self.indent_pattern.sub('', line)
 
@@ -175,26 +574,38 @@ class FencedCodeBlockReader(LineReaderDecorator):
 class LazyLineReader(LineReaderDecorator):
     """A reader supports laziness paragraphs."""
 
-    def fetch(self, relative: int = 0, **kwargs) -> str:
+    def try_fetch(self, relative: int = 0, **kwargs) -> Optional[str]:
+        kwargs['lazy'] = True
+        return self.reader.try_fetch(relative, **kwargs)
+
+    def first_char(self, relative: int = 0, **kwargs) -> Optional[str]:
+        kwargs['lazy'] = True
+        return self.reader.first_char(relative, **kwargs)
+
+    def indent(self, relative: int = 0, **kwargs) -> Optional[int]:
         kwargs['lazy'] = True
-        return self.reader.fetch(relative, **kwargs)
+        return self.reader.indent(relative, **kwargs)
+
+    def is_blank(self, relative: int = 0, **kwargs) -> bool:
+        kwargs['lazy'] = True
+        return self.reader.is_blank(relative, **kwargs)
 
     def eof(self, **kwargs) -> bool:
         kwargs['lazy'] = True
         return self.reader.eof(**kwargs)
 
 
-class ListItemReader(LineReaderDecorator):
+class ListItemReader(ContainerReader):
     """A reader for list items."""
 
     def __init__(self, reader: LineReader, markers: str, processor: "ListProcessor") -> None:
+        super().__init__(reader)
         self.markers = markers
         self.marker: str = None
-        self.indent: int = None
+        self.item_indent: int = None
         self.indent_pattern: Pattern = None
         self.beginning_lineno = reader.lineno + 1
         self.processor = processor
-        super().__init__(reader)
 
         self.recognize_list_item()
 
@@ -219,39 +630,66 @@ class ListItemReader(LineReaderDecorator):
             self.set_indent(indent)
 
     def set_indent(self, indent: int) -> None:
-        self.indent = indent
+        self.item_indent = indent
         self.indent_pattern = re.compile('^ {%d}' % indent)
+        self.clear_cache()
 
-    def fetch(self, relative: int = 0, **kwargs) -> str:
-        if kwargs.get('lazy'):
-            reader: LineReader = LazyLineReader(self.reader)
-        else:
-            reader = self.reader
-
-        if self.is_beginning_line(relative):
+    def get_fetch_options(self, relative: int, **kwargs) -> Dict[str, Any]:
+        if self.markers_required and self.is_beginning_line(relative):
             # skip over a list marker on the beginning line
-            kwargs.setdefault('markers', []).insert(0, self.markers)
+            kwargs['markers'] = [self.markers] + kwargs.get('markers', [])
 
-        line = self.reader.fetch(relative, **kwargs)
+        return kwargs
+
+    def strip(self, line: str, relative: int, **kwargs) -> Optional[str]:
         if self.is_beginning_line(relative):
             # remove a list marker and indents when the beginning line
-            return line[self.indent:]
+            return line[self.item_indent:]
         elif self.indent_pattern.match(line):
             return self.indent_pattern.sub('', line)
         elif line.strip() == '':
             return '\n'
-        elif self.processor.match(reader, in_list=True):
-            # next list item found
-            raise IOError
+        elif self.is_interrupted_by_next_item(**kwargs):
+            return None
         elif kwargs.get('lazy') and line.lstrip():
             return line
         else:
-            raise IOError
+            return None
+
+    def is_interrupted_by_next_item(self, **kwargs) -> bool:
+        """Checks the next line of the underlying reader starts a next list item.
+
+        This also returns True if the underlying reader has no next line.
+        """
+        reader = self.get_lookahead_reader(**kwargs)
+        if reader.try_fetch(1) is None:
+            return True
+        else:
+            return self.processor.match(reader, in_list=True)
+
+    def get_lookahead_reader(self, **kwargs) -> LineReader:
+        """Returns the underlying reader to look for the next list item."""
+        if kwargs.get('lazy'):
+            return LazyLineReader(self.reader)
+        else:
+            return self.reader
 
     def is_beginning_line(self, relative: int) -> bool:
         return self.lineno + relative == self.beginning_lineno
 
 
+def get_cache_key(relative: int, options: Dict[str, Any]) -> Tuple:
+    """Converts the arguments of fetch() to a hashable key."""
+    key: List[Any] = [relative]
+    for name, value in sorted(options.items()):
+        if isinstance(value, list):
+            key.append((name, tuple(value)))
+        else:
+            key.append((name, value))
+
+    return tuple(key)
+
+
 class TextReader:
     """A character based reader."""
 
@@ -264,15 +702,39 @@ class TextReader:
 
     @property
     def remain(self) -> str:
+        """Returns the rest of text.
+
+        This makes a copy of the text.  Use :meth:`match()`, :meth:`peek()`
+        and :attr:`at_end` instead on the hot path.
+        """
         return self.subject[self.position:]
 
+    @property
+    def at_end(self) -> bool:
+        """Returns it reaches the end of text or not."""
+        return self.position >= len(self.subject)
+
+    def peek(self) -> str:
+        """Returns the character at the current position (or empty string at the end)."""
+        return self.subject[self.position:self.position + 1]
+
     def step(self, n: int = 1) -> None:
         self.position += n
 
+    def match(self, pattern: Pattern) -> Match:
+        """Matches the pattern at the current position without moving it.
+
+        The whole text is given to the pattern with the position.  Hence ``^``
+        does not match at the current position unless it is the beginning of
+        the text.
+        """
+        return pattern.match(self.subject, self.position)
+
     def consume(self, pattern: Pattern) -> Match:
-        matched = pattern.match(self.remain)
+        """Matches the pattern like :meth:`match()`, and moves to the end of the match."""
+        matched = pattern.match(self.subject, self.position)
         if matched:
-            self.step(len(matched.group(0)))
+            self.position = matched.end()
 
         return matched
 
@@ -287,8 +749,17 @@ class MultiLineReader(LineReaderDecorator):
         super().__init__(reader)
         self.text_reader = TextReader('')  # dummy
 
-    def fetch(self, relative: int = 0, **kwargs) -> str:
-        return self.reader.fetch(relative, **kwargs)
+    def try_fetch(self, relative: int = 0, **kwargs) -> Optional[str]:
+        return self.reader.try_fetch(relative, **kwargs)
+
+    def first_char(self, relative: int = 0, **kwargs) -> Optional[str]:
+        return self.reader.first_char(relative, **kwargs)
+
+    def indent(self, relative: int = 0, **kwargs) -> Optional[int]:
+        return self.reader.indent(relative, **kwargs)
+
+    def is_blank(self, relative: int = 0, **kwargs) -> bool:
+        return self.reader.is_blank(relative, **kwargs)
 
     def step(self, n: int = 1) -> None:
         super().step(n)
@@ -302,7 +773,8 @@ class MultiLineReader(LineReaderDecorator):
         self.text_reader.position = position[1]
 
     def eol(self) -> bool:
-        return self.remain == "\n"
+        reader = self.text_reader
+        return reader.subject.endswith("\n") and reader.position == len(reader.subject) - 1
 
     @property
     def remain(self) -> str:
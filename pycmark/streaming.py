@@ -0,0 +1,134 @@
+"""
+    pycmark.streaming
+    ~~~~~~~~~~~~~~~~~
+
+    A streaming parser yields top-level blocks.
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Set, TYPE_CHECKING, Tuple, cast
+
+from docutils.core import Publisher
+from docutils.nodes import FixedTextElement, Node, TextElement
+from docutils.utils import new_document
+
+from pycmark.readers import StreamLineReader
+from pycmark.transforms import InlineTransform, SectionTreeConstructor
+
+if TYPE_CHECKING:
+    from pycmark import Parser
+
+
+def is_text_container(node: Node) -> bool:
+    return isinstance(node, TextElement) and not isinstance(node, FixedTextElement)
+
+
+class BlockStream:
+    """An iterator of top-level blocks parsed from a stream of lines.
+
+    Each block is yielded as soon as it is closed, with inline parsing and the
+    transforms of the parser applied.  Only the lines of the current block are
+    kept in memory.
+
+    A block referring to link labels not defined yet is held, together with the
+    following blocks to keep the order, until the labels are defined, because
+    link reference definitions can appear after their references.  The held
+    blocks are yielded at the end of the stream at the latest.  Not to keep
+    the whole stream in memory for a label never defined, they are also
+    yielded without waiting further when more than ``max_held_blocks`` blocks
+    are held; their undefined labels are left as text.  If
+    *forward_references* is False, only the definitions appeared before are
+    used, and blocks are never held.
+
+    The tree of sections needs the whole document.  So headings are yielded
+    as flat section nodes which contain only their title (see the ``depth``
+    attribute for their level).
+    """
+
+    #: the maximum number of blocks held for forward references
+    max_held_blocks = 1000
+
+    def __init__(self, parser: "Parser", lines: Iterable[str], source_path: str = None,
+                 settings_overrides: Dict[str, Any] = None, forward_references: bool = True) -> None:
+        settings = Publisher(parser=parser).get_settings(**(settings_overrides or {}))
+        self.document = new_document(source_path or '<stream>', settings)
+        self.document.settings.inline_processors = parser.get_inline_processors()
+        self.reader = StreamLineReader(lines, source=self.document['source'])
+        self.block_parser = parser.create_block_parser()
+        self.inline_parser = InlineTransform(self.document).create_parser()
+        self.transforms = sorted((t for t in parser.get_transforms()
+                                  if not issubclass(t, (InlineTransform, SectionTreeConstructor))),
+                                 key=lambda t: t.default_priority)
+        self.forward_references = forward_references
+
+        #: blocks waiting to be yielded, and the link labels they are waiting for
+        self.pending: Deque[Tuple[List[Node], Set[str]]] = deque()
+
+    def __iter__(self) -> Iterator[Node]:
+        while not self.reader.eof():
+            self.reader.discard()
+            self.block_parser.parse_block(self.reader, self.document)
+            blocks = self.document.children[:]
+            del self.document.children[:]
+
+            if self.pending:
+                self.pending.append((blocks, set()))
+            else:
+                converted, labels = self.convert(blocks, final=not self.forward_references)
+                if labels:
+                    self.pending.append((converted, labels))
+                else:
+                    yield from converted
+
+            yield from self.release()
+            if len(self.pending) > self.max_held_blocks:
+                yield from self.release(final=True)
+
+        yield from self.release(final=True)
+
+    def release(self, final: bool = False) -> Iterator[Node]:
+        """Yields the held blocks whose link labels are defined (all blocks if final)."""
+        while self.pending:
+            blocks, labels = self.pending[0]
+            if not final and not all(label in self.document.nameids for label in labels):
+                break
+
+            self.pending.popleft()
+            converted, labels = self.convert(blocks, final)
+            if labels:
+                # still waiting for other labels
+                self.pending.appendleft((converted, labels))
+                break
+            else:
+                yield from converted
+
+    def convert(self, blocks: List[Node], final: bool = False) -> Tuple[List[Node], Set[str]]:
+        """Applies inline parsing and transforms to the blocks.
+
+        If the blocks refer to undefined link labels, this returns the blocks as they
+        were and the labels instead (unless final).
+        """
+        if final or ']' not in ''.join(node.astext() for node in blocks):
+            originals = blocks  # no link labels will be looked up
+        else:
+            originals = [node.deepcopy() for node in blocks]
+
+        self.document.extend(blocks)
+        self.inline_parser.undefined_labels = set()
+        for node in list(self.document.findall(is_text_container)):
+            self.inline_parser.parse(cast(TextElement, node))
+
+        labels = self.inline_parser.undefined_labels
+        if labels and not final:
+            del self.document.children[:]
+            return originals, labels
+
+        for transform_class in self.transforms:
+            transform_class(self.document).apply()
+
+        converted = self.document.children[:]
+        del self.document.children[:]
+        return converted, set()
@@ -8,7 +8,7 @@
     :license: Apache License 2.0, see LICENSE for details.
 """
 
-from typing import List, cast
+from typing import Callable, Dict, List, Sequence, cast
 
 from docutils import nodes
 from docutils.nodes import Element, FixedTextElement, Node, Text, TextElement
@@ -16,25 +16,48 @@ from docutils.transforms import Transform
 
 from pycmark import addnodes
 from pycmark.inlineparser import InlineParser
-from pycmark.utils import transplant_nodes
+from pycmark.inlineparser.tokens import CAN_CLOSE, CAN_OPEN, EMPHASIS, INTERIOR, Token, process_emphasis
+
+
+def replace_nodes(nodelist: Sequence[Node], convert: Callable[[Node], Node]) -> None:
+    """Replaces the nodes by the results of *convert*.
+
+    The children of each parent are rebuilt at once, instead of looking up the
+    index of each node in them.
+    """
+    parents: Dict[int, Element] = {}
+    for node in nodelist:
+        parents.setdefault(id(node.parent), node.parent)
+
+    targets = set(id(node) for node in nodelist)
+    for parent in parents.values():
+        children = []
+        for child in parent.children:
+            if id(child) in targets:
+                child = convert(child)
+                parent.setup_child(child)
+            children.append(child)
+        parent.children = children
 
 
 class BlanklineFilter(Transform):
     default_priority = 200
 
     def apply(self, **kwargs) -> None:
-        for node in list(self.document.findall(addnodes.blankline)):
-            node.parent.remove(node)
+        parents = {id(node.parent): node.parent for node in self.document.findall(addnodes.blankline)}
+        for parent in parents.values():
+            parent.children = [node for node in parent.children if not isinstance(node, addnodes.blankline)]
 
 
 class LinebreakFilter(Transform):
     default_priority = 200
 
     def apply(self, **kwargs) -> None:
-        for node in list(self.document.findall(addnodes.linebreak)):
+        linebreaks = list(self.document.findall(addnodes.linebreak))
+        for node in linebreaks:
             self.document.reporter.warning("A hard line break detected, ignored.",
                                            source=node.parent.source, line=node.parent.line)
-            node.replace_self(addnodes.SparseText('\n', 0, 1))
+        replace_nodes(linebreaks, lambda node: addnodes.SparseText('\n', 0, 1))
 
 
 class TightListsDetector(Transform):
@@ -50,6 +73,7 @@ class TightListsDetector(Transform):
         def has_loose_element(node: Element) -> bool:
             return any(isinstance(subnode, addnodes.blankline) for subnode in node[1:])
 
+        # findall() also visits lists nested in list_items
         for node in document.findall(is_list_node):  # type: Element
             children = cast(List[nodes.list_item], node)
             if any(has_loose_element(item) for item in children):
@@ -57,10 +81,6 @@ class TightListsDetector(Transform):
             else:
                 node['tight'] = True
 
-            # detect loose lists in list_items
-            for list_item in children:
-                self.detect(list_item)
-
 
 class TightListsCompactor(Transform):
     default_priority = 300
@@ -92,31 +112,35 @@ class SectionTreeConstructor(Transform):
             self.construct_section_tree(node)
 
     def construct_section_tree(self, container: Element) -> None:
-        current_depth = 0
-        last_section = None
-        for node in container[:]:
+        """Moves the nodes following each section into it.
+
+        The children of the container are partitioned in a single pass with
+        the stack of open sections; the nodes are not removed one by one.
+        """
+        children: List[Node] = []
+        sections: List[nodes.section] = []  # the open sections (the last one is the deepest)
+        for node in container.children:
             if isinstance(node, nodes.section):
-                if current_depth + 1 < node['depth']:
+                if len(sections) + 1 < node['depth']:
                     msg = ('Invalid deep section "%s" (<h%d>) appeared. Recognized a <h%d>.' %
-                           (node.astext(), node['depth'], current_depth + 1))
+                           (node.astext(), node['depth'], len(sections) + 1))
                     self.document.reporter.warning(msg, source=node[0].source, line=node[0].line)
-                    node['depth'] = current_depth + 1
-                elif current_depth >= node['depth']:
-                    # leave the section
-                    for _ in range(current_depth - node['depth'] + 1):
-                        if last_section is not None:
-                            last_section = last_section.parent
-
-                if last_section:
-                    node.parent.remove(node)
-                    last_section += node
-
-                current_depth = node['depth']
-                last_section = node
+                    node['depth'] = len(sections) + 1
+                else:
+                    # leave the sections
+                    del sections[node['depth'] - 1:]
+
+                if sections:
+                    sections[-1] += node
+                else:
+                    children.append(node)
+                sections.append(node)
+            elif sections:
+                sections[-1] += node
             else:
-                if last_section:
-                    node.parent.remove(node)
-                    last_section += node
+                children.append(node)
+
+        container.children = children
 
 
 class InlineTransform(Transform):
@@ -132,9 +156,7 @@ class InlineTransform(Transform):
 
     def create_parser(self) -> InlineParser:
         parser = InlineParser()
-        for processor in self.document.settings.inline_processors:
-            parser.add_processor(processor(parser))
-
+        parser.add_processors(processor(parser) for processor in self.document.settings.inline_processors)
         return parser
 
 
@@ -142,10 +164,7 @@ class SparseTextConverter(Transform):
     default_priority = 250
 
     def apply(self, **kwargs) -> None:
-        for node in list(self.document.findall(addnodes.SparseText)):
-            pos = node.parent.index(node)
-            node.parent.remove(node)
-            node.parent.insert(pos, Text(str(node)))
+        replace_nodes(list(self.document.findall(addnodes.SparseText)), lambda node: Text(str(node)))
 
 
 class EmphasisConverter(Transform):
@@ -159,78 +178,156 @@ class EmphasisConverter(Transform):
 
     def apply(self, **kwargs) -> None:
         for node in list(self.document.findall(TextElement)):
-            while True:
-                markers = list(n for n in node.children if isinstance(n, addnodes.emphasis))
-                closers = list(d for d in markers if d['can_close'])
-                if len(closers) == 0:
-                    break
-                closer = closers[0]
-                opener = self.find_opener(markers, closer)
-                if opener is None:
-                    closer['can_close'] = False
-                    continue
-
-                if opener['curr_length'] >= 2 and closer['curr_length'] >= 2:
-                    length = 2
-                    emph_node: Element = nodes.strong()
-                else:
-                    length = 1
-                    emph_node = nodes.emphasis()
+            if any(isinstance(n, addnodes.emphasis) for n in node.children):
+                self.process_emphasis(node)
+
+    def process_emphasis(self, node: Element) -> None:
+        """Converts emphasis markers in the children of the node to emphasis and strong nodes.
+
+        The markers are converted to tokens and processed by
+        :func:`pycmark.inlineparser.tokens.process_emphasis()`.
+        """
+        children = [self.convert_marker(n) if isinstance(n, addnodes.emphasis) else n for n in node.children]
+        node.children = []
+        node.extend(process_emphasis(children))
+        self.convert_tokens(node)
+
+    def convert_marker(self, node: addnodes.emphasis) -> Token:
+        flags = 0
+        if node['can_open']:
+            flags |= CAN_OPEN
+        if node['can_close']:
+            flags |= CAN_CLOSE
+        if node['interior']:
+            flags |= INTERIOR
+        token = Token(EMPHASIS, node['marker'], 0, node['curr_length'], flags)
+        token.length = node['orig_length']
+        return token
+
+    def convert_tokens(self, node: Element) -> None:
+        """Converts the tokens left in the node and the emphasis nodes built to texts."""
+        for i, child in enumerate(node.children):
+            if isinstance(child, Token):
+                node[i] = Text(str(child))
+            elif isinstance(child, (nodes.emphasis, nodes.strong)):
+                self.convert_tokens(child)
 
-                transplant_nodes(node, emph_node, start=opener, end=closer)
-                self.deactivate_markers(emph_node)
 
-                opener_pos = node.index(opener)
-                node.insert(opener_pos + 1, emph_node)
-                opener.shrink(length)
-                closer.shrink(length)
+class BracketConverter(Transform):
+    default_priority = 250
 
-            self.deactivate_markers(node)
+    def apply(self, **kwargs) -> None:
+        replace_nodes(list(self.document.findall(addnodes.bracket)), lambda node: Text(str(node)))
 
-    def find_opener(self, markers: List[addnodes.emphasis], closer: addnodes.emphasis) -> addnodes.emphasis:
-        pos = markers.index(closer)
-        for opener in reversed(markers[:pos]):
-            if opener['can_open'] is False:
-                continue
-            elif opener['marker'][0] != closer['marker'][0]:
+
+class TextNodeConnector(Transform):
+    default_priority = SparseTextConverter.default_priority + 10
+
+    def apply(self, **kwargs) -> None:
+        for node in self.document.findall(TextElement):
+            self.connect_text_nodes(node)
+
+    def connect_text_nodes(self, node: Element) -> None:
+        """Joins the runs of adjacent Text nodes in the children of the node.
+
+        The children are walked once, and rebuilt in a single assignment.
+        """
+        children: List[Node] = []
+        texts: List[Text] = []
+        for child in node.children + [None]:
+            if isinstance(child, Text):
+                texts.append(child)
                 continue
-            elif (opener['interior'] and opener['orig_length'] % 3 == 0 and
-                  closer['interior'] and closer['orig_length'] % 3 == 0):
-                return opener
-            else:
-                odd_match = ((closer['interior'] or opener['interior']) and
-                             (opener['orig_length'] + closer['orig_length']) % 3 == 0)
-                if not odd_match:
-                    return opener
+            elif len(texts) == 1:
+                children.append(texts[0])
+            elif len(texts) > 1:
+                text = Text(''.join(texts))
+                node.setup_child(text)
+                children.append(text)
 
-        return None
+            texts = []
+            if child is not None:
+                children.append(child)
 
-    def deactivate_markers(self, node: Element) -> None:
-        markers = list(n for n in node.children if isinstance(n, addnodes.emphasis))
-        for delim in markers:
-            marker = str(delim)
-            delim.replace_self(Text(marker))
+        node.children = children
 
 
-class BracketConverter(Transform):
-    default_priority = 250
+class FusedCleanupTransform(Transform):
+    """Cleans up the document after the block parsing in a single depth-first walk.
+
+    This does the same as the transforms in ``fused_transforms`` (in their order)
+    instead of traversing the whole document for each of them: the blank lines
+    are removed on the walk, and then the section trees of the containers found
+    on it are constructed.  They all have the same priority, so the transforms
+    of other priorities (including the ones of other components) see the same
+    tree as without fusing.  It is enabled by ``Parser.fused_transforms``.
+
+    :class:`LinebreakFilter` also has the same priority, but it is not fused
+    because subclasses of the parser remove it to keep hard line breaks.
+    """
+    default_priority = 200
+    fused_transforms = [
+        BlanklineFilter,
+        SectionTreeConstructor,
+    ]
 
     def apply(self, **kwargs) -> None:
-        for node in list(self.document.findall(addnodes.bracket)):
-            node.replace_self(Text(node['marker']))
+        containers: List[Element] = []
+        self.visit(self.document, containers)
 
+        section_tree_constructor = SectionTreeConstructor(self.document)
+        for container in containers:
+            section_tree_constructor.construct_section_tree(container)
 
-class TextNodeConnector(Transform):
-    default_priority = SparseTextConverter.default_priority + 10
+    def visit(self, node: Element, containers: List[Element]) -> None:
+        if isinstance(node, (nodes.document, nodes.block_quote, nodes.list_item)):
+            containers.append(node)
+
+        # BlanklineFilter
+        children = [child for child in node.children if not isinstance(child, addnodes.blankline)]
+        node.children = children
+
+        for child in children:
+            if isinstance(child, Element):
+                self.visit(child, containers)
+
+
+class FusedConverterTransform(Transform):
+    """Converts the nodes left by the inline parser in a single depth-first walk.
+
+    The standard inline processors resolve their markers on parsing; this
+    converts the markers built by other processors (and the texts built by
+    :class:`LinebreakFilter`) instead.  It does the same as the transforms in
+    ``fused_transforms``, which all have the same priority.  It is enabled by
+    ``Parser.fused_transforms``.
+    """
+    default_priority = 250
+    fused_transforms = [
+        BracketConverter,
+        EmphasisConverter,
+        SparseTextConverter,
+    ]
 
     def apply(self, **kwargs) -> None:
-        for node in list(self.document.findall(TextElement)):
-            pos = 0
-            while len(node) > pos + 1:
-                if isinstance(node[pos], Text) and isinstance(node[pos + 1], Text):
-                    text = node[pos] + node[pos + 1]  # type: ignore
-                    node.remove(node[pos + 1])
-                    node.remove(node[pos])
-                    node.insert(pos, Text(text))
-                else:
-                    pos += 1
+        self.emphasis_converter = EmphasisConverter(self.document)
+        self.visit(self.document)
+
+    def visit(self, node: Element) -> None:
+        # BracketConverter and SparseTextConverter
+        children: List[Node] = []
+        for child in node.children:
+            if isinstance(child, (addnodes.bracket, addnodes.SparseText)):
+                text = Text(str(child))
+                node.setup_child(text)
+                children.append(text)
+            else:
+                children.append(child)
+        node.children = children
+
+        # EmphasisConverter
+        if isinstance(node, TextElement) and any(isinstance(n, addnodes.emphasis) for n in children):
+            self.emphasis_converter.process_emphasis(node)
+
+        for child in node.children:
+            if isinstance(child, Element):
+                self.visit(child)
@@ -9,11 +9,14 @@
 """
 
 import re
-from typing import List
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, List, Pattern, Sequence, Tuple
 from urllib.parse import quote, unquote
 
 from docutils import nodes
 from docutils.nodes import Element, Node
+from docutils.utils import Reporter
 
 # common regexp
 ESCAPED_CHARS = r'\\[!"#$%&\'()*+,./:;<=>?@[\\\]^_`{|}~-]'
@@ -51,8 +54,17 @@ def normalize_uri(s: str) -> str:
     return quote(unquote(s), safe=safe)
 
 
-def expand_leading_tabs(text: str, markers: List[str] = [], tabstop: int = 4) -> str:
-    leading_spaces_pattern = re.compile(r'^\s*%s\s*' % r'\s*'.join(markers))
+@lru_cache(maxsize=256)
+def get_leading_spaces_pattern(markers: Tuple[str, ...]) -> Pattern:
+    """Returns a compiled pattern for leading spaces and the stack of container markers."""
+    return re.compile(r'^\s*%s\s*' % r'\s*'.join(markers))
+
+
+def expand_leading_tabs(text: str, markers: Sequence[str] = (), tabstop: int = 4) -> str:
+    if '\t' not in text:
+        return text
+
+    leading_spaces_pattern = get_leading_spaces_pattern(tuple(markers))
     matched = leading_spaces_pattern.match(text)
     if matched and '\t' in matched.group(0):
         expanded = matched.group(0).expandtabs(tabstop)
@@ -74,6 +86,55 @@ def get_root_document(node: Node) -> nodes.document:
     return node
 
 
+def note_targets(document: nodes.document) -> List[nodes.target]:
+    """Registers the sections and the link targets in the document again (in document order).
+
+    The targets whose names have already been registered are not registered.
+    This returns them.
+    """
+    duplicated = []
+    for node in document.findall(nodes.Element):
+        if isinstance(node, nodes.section):
+            node['ids'] = []
+            document.note_implicit_target(node)
+        elif isinstance(node, nodes.target):
+            node['ids'] = []
+            if node['names'][0] not in document.nameids:
+                document.note_explicit_target(node)
+            else:
+                duplicated.append(node)
+
+    return duplicated
+
+
+@contextmanager
+def collect_messages(reporter: Reporter) -> Iterator[List[nodes.system_message]]:
+    """Collects the messages reported through the reporter in the context."""
+    messages: List[nodes.system_message] = []
+    reporter.attach_observer(messages.append)
+    try:
+        yield messages
+    finally:
+        reporter.detach_observer(messages.append)
+
+
+def report_again(reporter: Reporter, message: nodes.system_message,
+                 source: str = None, line_offset: int = 0) -> nodes.system_message:
+    """Reports the message again through the reporter, and returns the new message.
+
+    This is used for the messages reported on building the cached doctrees.
+    The message is relocated to *source* (if given) and shifted by *line_offset*.
+    """
+    attributes = {'source': message.get('source')}
+    if source and attributes['source'] is not None:
+        attributes['source'] = source
+    if message.get('line') is not None:
+        attributes['line'] = message['line'] + line_offset
+
+    children = [child.deepcopy() for child in message.children[1:]]
+    return reporter.system_message(message['level'], message[0].astext(), *children, **attributes)
+
+
 def transplant_nodes(parent: Element, new_parent: Element, start: Node, end: Node) -> Element:
     start_pos = parent.index(start)
     end_pos = parent.index(end)
@@ -0,0 +1,93 @@
+"""
+    test_batch
+    ~~~~~~~~~~
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+from typing import List, cast
+from unittest import mock
+
+from docutils import nodes
+from docutils.core import publish_doctree, publish_string
+from docutils.writers import get_writer_class
+from utils import assert_node
+
+from pycmark import Parser, convert_many
+from pycmark.blockparser.std_processors import ThematicBreakProcessor
+
+
+def test_convert_many():
+    texts = ["# Heading\n\nLorem *ipsum*\n",
+             "- dolor\n- sit\n",
+             "[amet]\n\n[amet]: /url\n"]
+    parser = Parser()
+    documents = cast(List[nodes.document], list(convert_many(texts, parser)))
+    assert len(documents) == 3
+    for text, document in zip(texts, documents):
+        assert document.pformat() == publish_doctree(text, parser=Parser()).pformat()
+
+    # components are shared, but settings are copied for each document
+    assert documents[0].settings is not documents[1].settings
+    assert vars(documents[0].settings) == vars(documents[1].settings)
+    assert parser.block_parser is not None
+
+
+def test_convert_many_does_not_leak_settings():
+    class SettingsModifier(Parser):
+        def parse(self, inputtext, document):
+            super().parse(inputtext, document)
+            if inputtext.startswith('modify'):
+                document.settings.modified = True
+
+    documents = cast(List[nodes.document],
+                     list(convert_many(["modify settings\n", "Lorem ipsum\n"], SettingsModifier())))
+    assert documents[0].settings.modified is True
+    assert not hasattr(documents[1].settings, 'modified')
+
+
+def test_block_parser_is_rebuilt_on_changes():
+    class NoThematicBreakParser(Parser):
+        thematic_break = True
+
+        def get_block_processors(self):
+            processors = super().get_block_processors()
+            if not self.thematic_break:
+                processors.remove(ThematicBreakProcessor)
+            return processors
+
+    parser = NoThematicBreakParser()
+    document = publish_doctree("foo\n\n***\n\nbar\n", parser=parser)
+    assert_node(document[1], nodes.transition)
+    block_parser = parser.block_parser
+    publish_doctree("foo\n\n***\n\nbar\n", parser=parser)
+    assert parser.block_parser is block_parser
+
+    parser.thematic_break = False
+    document = publish_doctree("foo\n\n***\n\nbar\n", parser=parser)
+    assert parser.block_parser is not block_parser
+    assert_node(document[1], [nodes.paragraph, "***"])
+
+
+def test_convert_many_to_html():
+    texts = ["Lorem *ipsum*\n", "dolor `sit`\n"]
+    outputs = list(convert_many(texts, writer_name='html5'))
+    for text, output in zip(texts, outputs):
+        assert isinstance(output, str)
+        assert output == publish_string(text, parser=Parser(), writer=get_writer_class('html5')(),
+                                        settings_overrides={'output_encoding': 'unicode'})
+
+
+def test_convert_many_with_settings_overrides():
+    texts = ["# Heading\n\nLorem ipsum\n"]
+    documents = list(convert_many(texts, settings_overrides={'doctitle_xform': False}))
+    assert_node(documents[0], [nodes.document, nodes.section, ([nodes.title, "Heading"],
+                                                               [nodes.paragraph, "Lorem ipsum"])])
+
+
+def test_convert_many_shuts_down_workers():
+    parser = Parser()
+    with mock.patch.object(parser, 'shutdown') as shutdown:
+        list(convert_many(["Lorem ipsum\n"], parser))
+    shutdown.assert_called_once_with()
@@ -0,0 +1,63 @@
+"""
+    test_blockparser
+    ~~~~~~~~~~~~~~~~
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+import pytest
+
+from pycmark import Parser
+from pycmark.blockparser import BlockParser, BlockProcessor
+from pycmark.blockparser.std_processors import (
+    ATXHeadingProcessor, BlankLineProcessor, ParagraphProcessor, SetextHeadingProcessor, ThematicBreakProcessor
+)
+
+
+class DummyProcessor(BlockProcessor):
+    pass
+
+
+def test_dispatch_table():
+    parser = BlockParser()
+    for processor in (ParagraphProcessor, ThematicBreakProcessor, ATXHeadingProcessor, BlankLineProcessor):
+        parser.add_processor(processor(parser))
+
+    def candidates(line):
+        return [p.__class__ for p in parser.get_candidates(line)]
+
+    assert candidates("# heading\n") == [ATXHeadingProcessor, ParagraphProcessor]
+    assert candidates("  * * *\n") == [ThematicBreakProcessor, ParagraphProcessor]
+    assert candidates("   \n") == [BlankLineProcessor, ParagraphProcessor]
+    assert candidates("") == [BlankLineProcessor, ParagraphProcessor]
+    assert candidates("Lorem ipsum\n") == [ParagraphProcessor]
+
+
+def test_dispatch_table_keeps_priority_order():
+    parser = Parser().create_block_parser()
+    parser.add_processor(DummyProcessor(parser))
+
+    for candidates in list(parser.dispatch_table.values()) + [parser.fallback_processors]:
+        assert DummyProcessor in [p.__class__ for p in candidates]
+        assert candidates == sorted(candidates, key=lambda p: (p.priority, p))
+
+
+def test_interrupters():
+    parser = Parser().create_block_parser()
+
+    def interrupters(line):
+        return [p.__class__.__name__ for p in parser.get_interrupters(line)]
+
+    assert interrupters("Lorem ipsum\n") == []
+    assert interrupters("\n") == ['BlankLineProcessor']
+    assert interrupters("# heading\n") == ['ATXHeadingProcessor']
+    assert interrupters("- item\n") == ['ThematicBreakProcessor', 'NonEmptyBulletListProcessor']
+    assert interrupters("2. item\n") == ['OneBasedOrderedListProcessor']
+
+
+def test_SetextHeadingProcessor_is_deprecated():
+    parser = BlockParser()
+    with pytest.warns(DeprecationWarning):
+        processor = SetextHeadingProcessor(parser)
+    assert isinstance(processor, ParagraphProcessor)
@@ -0,0 +1,232 @@
+"""
+    test_cache
+    ~~~~~~~~~~
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+import os
+from io import StringIO
+
+from docutils import nodes
+from docutils.core import publish_doctree, publish_string
+from docutils.writers import get_writer_class
+from utils import assert_node
+
+from pycmark import Parser
+from pycmark.cache import BlockCache, BlockCachedParser, CachedParser, DoctreeCache
+from pycmark.transforms import TextNodeConnector
+
+
+class CountingParser(Parser):
+    called = 0
+
+    def parse(self, inputtext, document):
+        self.called += 1
+        super().parse(inputtext, document)
+
+
+def test_cached_parser(tmp_path):
+    text = ("# Heading\n"
+            "\n"
+            "Lorem *ipsum* [dolor]\n"
+            "\n"
+            "[dolor]: /url\n")
+    cache = DoctreeCache(str(tmp_path))
+    parser = CountingParser()
+    expected = publish_doctree(text, parser=Parser())
+
+    # miss
+    document = publish_doctree(text, parser=CachedParser(cache, parser))
+    assert document.pformat() == expected.pformat()
+    assert (cache.hits, cache.misses, parser.called) == (0, 1, 1)
+
+    # hit
+    document = publish_doctree(text, parser=CachedParser(cache, parser))
+    assert document.pformat() == expected.pformat()
+    assert (cache.hits, cache.misses, parser.called) == (1, 1, 1)
+    assert_node(document, [nodes.document, ([nodes.title, "Heading"],
+                                            [nodes.paragraph, ("Lorem ",
+                                                               [nodes.emphasis, "ipsum"],
+                                                               " ",
+                                                               [nodes.reference, "dolor"])],
+                                            nodes.target)])
+    assert document.nameids == expected.nameids
+    assert document.ids['dolor'] is document[2]
+    assert all(node.document is document for node in document.findall())
+
+
+def test_cached_parser_relocates_nodes(tmp_path):
+    text = "# Heading\n\nLorem ipsum\n"
+    cache = DoctreeCache(str(tmp_path))
+    publish_doctree(text, source_path='/docs/a.md', parser=CachedParser(cache))
+    document = publish_doctree(text, source_path='/docs/b.md', parser=CachedParser(cache))
+    assert cache.hits == 1
+    assert {node.source for node in document.findall() if node.source is not None} == {'/docs/b.md'}
+
+
+def test_cached_parser_with_settings(tmp_path):
+    text = "# Heading\n"
+    cache = DoctreeCache(str(tmp_path))
+    publish_doctree(text, parser=CachedParser(cache))
+    document = publish_doctree(text, parser=CachedParser(cache), settings_overrides={'id_prefix': 'prefix-'})
+    assert cache.hits == 0
+    assert document['ids'][0].startswith('prefix-')
+
+
+def test_cached_parser_reports_messages(tmp_path):
+    def publish(parser):
+        stream = StringIO()
+        output = publish_string(text, parser=parser, writer=get_writer_class('pseudoxml')(),
+                                settings_overrides={'warning_stream': stream})
+        return output, stream.getvalue()
+
+    text = ("# Heading\n"
+            "\n"
+            "### Subheading\n"
+            "\n"
+            "Lorem  \n"
+            "ipsum\n")
+    cache = DoctreeCache(str(tmp_path))
+    expected, warnings = publish(Parser())
+    assert b'Docutils System Messages' in expected
+    assert publish(CachedParser(cache)) == (expected, warnings)  # miss
+    assert publish(CachedParser(cache)) == (expected, warnings)  # hit
+    assert cache.hits == 1
+
+
+def test_cache_key(tmp_path):
+    class CustomParser(Parser):
+        def get_transforms(self):
+            return [t for t in super().get_transforms() if t is not TextNodeConnector]
+
+    cache = DoctreeCache(str(tmp_path))
+    key = CachedParser(cache).get_key("Lorem ipsum\n")
+    assert CachedParser(cache).get_key("Lorem ipsum\n") == key
+    assert CachedParser(cache).get_key("Lorem ipsum dolor\n") != key
+    assert CachedParser(cache, CustomParser()).get_key("Lorem ipsum\n") != key
+
+
+def test_broken_entry(tmp_path):
+    cache = DoctreeCache(str(tmp_path))
+    parser = CachedParser(cache)
+    publish_doctree("Lorem ipsum\n", parser=parser)
+    [(_, _, path)] = cache.scan()
+    with open(path, 'wb') as f:
+        f.write(b'broken')
+
+    document = publish_doctree("Lorem ipsum\n", parser=parser)
+    assert_node(document, [nodes.document, nodes.paragraph, "Lorem ipsum"])
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    document = publish_doctree("Lorem ipsum\n", parser=parser)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_eviction(tmp_path):
+    cache = DoctreeCache(str(tmp_path))
+    parser = CachedParser(cache)
+    for i in range(10):
+        paths = {path for _, _, path in cache.scan()}
+        publish_doctree("paragraph %d\n" % i, parser=parser)
+        [path] = {path for _, _, path in cache.scan()} - paths
+        os.utime(path, (i, i))
+
+    # the least recently used entries are evicted
+    entries = sorted(cache.scan())
+    cache.max_size = sum(size for _, size, _ in entries) - 1
+    cache.evict()
+    remains = sorted(cache.scan())
+    assert sum(size for _, size, _ in remains) <= cache.max_size * cache.low_watermark
+    assert [path for _, _, path in remains] == [path for _, _, path in entries[-len(remains):]]
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith('.tmp')]
+
+
+def test_cache_size(tmp_path):
+    cache = DoctreeCache(str(tmp_path))
+    document = publish_doctree("Lorem ipsum\n", parser=Parser())
+    cache.store('key1', document)
+    cache.store('key2', document)
+    size = cache.size
+    cache.store('key2', document)  # overwritten
+    assert cache.size == size == sum(size for _, size, _ in cache.scan())
+
+
+def test_block_cached_parser():
+    cache = BlockCache()
+    parser = BlockCachedParser(cache)
+    document = publish_doctree("# Heading\n\nLicensed under *the license*\n", parser=parser)
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    text = ("Lorem ipsum\n"
+            "\n"
+            "\n"
+            "Licensed under *the license*\n")
+    document = publish_doctree(text, parser=parser)
+    assert document.pformat() == publish_doctree(text, parser=Parser()).pformat()
+    assert (cache.hits, cache.misses) == (3, 4)  # blank lines and the paragraph
+    assert cache.hit_rate == 3 / 7
+
+    # a copy relocated to the document
+    assert_node(document[1], [nodes.paragraph, ("Licensed under ",
+                                                [nodes.emphasis, "the license"])])
+    assert document[1].line == 4
+    assert document[1].document is document
+
+
+def test_block_cached_parser_reports_messages():
+    def publish(text, parser):
+        stream = StringIO()
+        output = publish_string(text, parser=parser, writer=get_writer_class('pseudoxml')(),
+                                settings_overrides={'warning_stream': stream})
+        return output, sorted(stream.getvalue().splitlines())
+
+    text = ("# Heading\n"
+            "\n"
+            "### Subheading\n"
+            "\n"
+            "> Lorem  \n"
+            "> ipsum\n")
+    cache = BlockCache()
+    expected, warnings = publish(text, Parser())
+    assert b'Docutils System Messages' in expected
+    assert publish(text, BlockCachedParser(cache)) == (expected, warnings)
+    assert (cache.hits, cache.misses) == (1, 4)  # the second blank line is a hit
+
+    # the messages of reused blocks are reported again (at the new lines)
+    text = "Dolor\n\n\n" + text
+    expected, warnings = publish(text, Parser())
+    assert publish(text, BlockCachedParser(cache)) == (expected, warnings)
+    assert (cache.hits, cache.misses) == (8, 5)
+
+
+def test_block_cache_with_link_reference_definitions():
+    cache = BlockCache()
+    parser = BlockCachedParser(cache)
+    document = publish_doctree("[foo]\n\n[foo]: /url\n", parser=parser)
+    assert next(document[0].findall(nodes.reference))['refuri'] == '/url'
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    # the same definition
+    document = publish_doctree("[foo]: /url\n\n[foo]\n", parser=parser)
+    assert next(document[1].findall(nodes.reference))['refuri'] == '/url'
+    assert (cache.hits, cache.misses) == (3, 3)
+
+    # another definition
+    document = publish_doctree("[foo]\n\n[foo]: /another\n", parser=parser)
+    assert next(document[0].findall(nodes.reference))['refuri'] == '/another'
+    assert (cache.hits, cache.misses) == (4, 5)
+
+    # no definitions
+    document = publish_doctree("[foo]\n", parser=parser)
+    assert_node(document, [nodes.document, nodes.paragraph, "[foo]"])
+    assert (cache.hits, cache.misses) == (4, 6)
+
+
+def test_block_cache_eviction():
+    cache = BlockCache(maxsize=2)
+    parser = BlockCachedParser(cache)
+    publish_doctree("foo\n\nbar\n\nbaz\n", parser=parser)
+    assert list(cache.entries) == ["\n", "baz\n"]
+    assert cache.size == 2
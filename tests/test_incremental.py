@@ -0,0 +1,98 @@
+"""
+    test_incremental
+    ~~~~~~~~~~~~~~~~
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+from docutils import nodes
+from docutils.core import publish_doctree
+from docutils.readers.standalone import Reader
+from utils import assert_node
+
+from pycmark import Parser
+from pycmark.incremental import IncrementalParser
+
+
+class NoTransformsReader(Reader):
+    def get_transforms(self):
+        return []
+
+
+def parse(text):
+    return publish_doctree(text, reader=NoTransformsReader(), parser=Parser())
+
+
+def test_parse():
+    text = ("# Heading\n"
+            "\n"
+            "Lorem *ipsum*\n"
+            "\n"
+            "- dolor\n"
+            "- sit\n")
+    parser = IncrementalParser()
+    blocks = parser.parse(text)
+    assert [(b.start, b.end) for b in blocks] == [(0, 1), (1, 2), (2, 3), (3, 4), (4, 6)]
+    assert_node(blocks[2].nodes[0], [nodes.paragraph, ("Lorem ",
+                                                       [nodes.emphasis, "ipsum"])])
+    assert parser.get_doctree().pformat() == parse(text).pformat()
+
+
+def test_edit():
+    parser = IncrementalParser()
+    parser.parse("foo\n\nbar\n\nbaz\n\nqux\n")
+    changed = parser.edit(2, 3, "bar *bar*\nbar\n")
+    assert [(b.start, b.end) for b in changed] == [(2, 4)]
+    assert_node(changed[0].nodes[0], [nodes.paragraph, ("bar ",
+                                                        [nodes.emphasis, "bar"],
+                                                        "\nbar")])
+
+    # the following blocks are shifted
+    assert [(b.start, b.end) for b in parser.blocks[-3:]] == [(5, 6), (6, 7), (7, 8)]
+    assert parser.get_doctree().pformat() == parse("foo\n\nbar *bar*\nbar\n\nbaz\n\nqux\n").pformat()
+
+
+def test_edit_changes_block_structure():
+    parser = IncrementalParser()
+    parser.parse("foo\n\nbar\n\nbaz\n")
+
+    # joins paragraphs
+    changed = parser.edit(1, 2, "")
+    assert [(b.start, b.end) for b in changed] == [(0, 2)]
+    assert_node(changed[0].nodes[0], [nodes.paragraph, "foo\nbar"])
+
+    # turns the paragraph into a heading
+    changed = parser.edit(2, 2, "===\n")
+    assert_node(changed[0].nodes[0], [nodes.section, nodes.title, "foo\nbar"])
+    assert parser.get_doctree().pformat() == parse("foo\nbar\n===\n\nbaz\n").pformat()
+
+
+def test_edit_opening_fence():
+    parser = IncrementalParser()
+    parser.parse("foo\n\nbar\n\nbaz\n")
+    changed = parser.edit(1, 1, "```\n")
+    assert_node(changed[-1].nodes[0], [nodes.literal_block, "\nbar\n\nbaz\n"])
+    assert parser.get_doctree().pformat() == parse("foo\n```\n\nbar\n\nbaz\n").pformat()
+
+
+def test_edit_link_reference_definitions():
+    parser = IncrementalParser()
+    parser.parse("[foo]\n\n[bar]\n\nbaz\n")
+    assert_node(parser.blocks[0].nodes[0], [nodes.paragraph, "[foo]"])
+
+    # adding a definition converts the paragraphs referring to the label
+    changed = parser.edit(5, 5, "\n[foo]: /url\n")
+    assert [(b.start, b.end) for b in changed] == [(4, 5), (5, 6), (6, 7), (0, 1)]
+    assert_node(parser.blocks[0].nodes[0], [nodes.paragraph, nodes.reference, "foo"])
+    assert next(parser.blocks[0].nodes[0].findall(nodes.reference))['refuri'] == '/url'
+
+    # changing the definition
+    changed = parser.edit(6, 7, "[foo]: /changed\n")
+    assert [(b.start, b.end) for b in changed] == [(6, 7), (0, 1)]
+    assert next(parser.blocks[0].nodes[0].findall(nodes.reference))['refuri'] == '/changed'
+
+    # removing the definition
+    changed = parser.edit(6, 7, "")
+    assert [(b.start, b.end) for b in changed] == [(0, 1)]
+    assert_node(parser.blocks[0].nodes[0], [nodes.paragraph, "[foo]"])
@@ -0,0 +1,127 @@
+"""
+    test_inlineparser
+    ~~~~~~~~~~~~~~~~~
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+from docutils import nodes
+from utils import assert_node
+
+from pycmark import Parser
+from pycmark.inlineparser import BracketStack, InlineParser, InlineProcessor
+from pycmark.inlineparser.tokens import (
+    ACTIVE,
+    BRACKET,
+    CAN_CLOSE,
+    CAN_OPEN,
+    EMPHASIS,
+    TEXT,
+    Token,
+    resolve_tokens,
+)
+from pycmark.readers import TextReader
+
+
+class DummyProcessor(InlineProcessor):
+    pass
+
+
+def create_parser():
+    parser = InlineParser()
+    for processor in Parser().get_inline_processors():
+        parser.add_processor(processor(parser))
+    return parser
+
+
+def test_find_next_trigger():
+    parser = create_parser()
+
+    def find_next_trigger(text, position=0):
+        return parser.find_next_trigger(TextReader(text, position))
+
+    assert find_next_trigger("hello world") == 11
+    assert find_next_trigger("hello *world*") == 6
+    assert find_next_trigger("hello *world*", 7) == 12
+    assert find_next_trigger("hello world \nfoo") == 11
+    assert find_next_trigger("hello world\nfoo") == 15
+    assert find_next_trigger("hello world  \nfoo") == 11
+    assert find_next_trigger("hello ![world]") == 6
+
+    # a processor without trigger disables skipping
+    parser.add_processor(DummyProcessor(parser))
+    assert parser.trigger_pattern is None
+    assert find_next_trigger("hello world") == 0
+
+
+def test_plain_text_is_skipped_over():
+    parser = create_parser()
+    paragraph = nodes.paragraph('', 'hello world, *foo* \\bar')
+    parser.parse(paragraph)
+    assert len(paragraph) == 3
+    assert paragraph[0] == 'hello world, '
+    assert paragraph[1].astext() == 'foo'
+    assert paragraph[2] == ' \\bar'
+
+
+def test_BracketStack():
+    stack = BracketStack()
+    link1 = Token(BRACKET, '[', 0, 1, CAN_OPEN | ACTIVE)
+    image = Token(BRACKET, '![', 0, 2, CAN_OPEN | ACTIVE)
+    link2 = Token(BRACKET, '[', 0, 1, CAN_OPEN | ACTIVE)
+    link3 = Token(BRACKET, '[', 0, 1, CAN_OPEN | ACTIVE)
+    stack.push(link1, 0)
+    stack.push(image, 1)
+    stack.push(link2, 3)
+    assert len(stack) == 3
+
+    # a link found; all "[" openers in the stack are deactivated
+    stack.deactivate_links()
+    stack.push(link3, 5)
+    assert stack.pop() == (link3, 5)
+    assert link3.flags & ACTIVE
+    assert stack.pop() == (link2, 3)
+    assert not link2.flags & ACTIVE
+    assert stack.pop() == (image, 1)
+    assert image.flags & ACTIVE
+    assert stack.pop() == (link1, 0)
+    assert not link1.flags & ACTIVE
+
+
+def test_resolve_tokens():
+    subject = "**foo* bar_"
+    paragraph = nodes.paragraph()
+    paragraph += Token(EMPHASIS, subject, 0, 2, CAN_OPEN)
+    paragraph += Token(TEXT, subject, 2, 5)
+    paragraph += Token(EMPHASIS, subject, 5, 6, CAN_CLOSE)
+    paragraph += nodes.Text(" ")
+    paragraph += Token(TEXT, subject, 7, 10)
+    paragraph += Token(EMPHASIS, subject, 10, 11, CAN_CLOSE)
+    resolve_tokens(paragraph)
+
+    # markers are paired (or converted to texts), and adjacent texts are joined
+    assert_node(paragraph, [nodes.paragraph, ("*",
+                                              [nodes.emphasis, "foo"],
+                                              " bar_")])
+
+
+def test_copy_tokens():
+    subject = "*foo*"
+    tokens = [Token(EMPHASIS, subject, 0, 1, CAN_OPEN),
+              Token(TEXT, subject, 1, 4),
+              Token(EMPHASIS, subject, 4, 5, CAN_CLOSE)]
+    tokens[0].end = 0  # consumed marker
+    paragraph = nodes.paragraph('', '', *tokens)
+
+    copied = paragraph.deepcopy()
+    for token, copy in zip(tokens, copied.children):
+        assert isinstance(copy, Token)
+        assert copy is not token
+        assert ((copy.kind, copy.start, copy.end, copy.flags, copy.length) ==
+                (token.kind, token.start, token.end, token.flags, token.length))
+
+    assert paragraph.pformat() == ("<paragraph>\n"
+                                   "    <Token 1: ''>\n"
+                                   "    <Token 0: 'foo'>\n"
+                                   "    <Token 1: '*'>\n")
@@ -219,6 +219,13 @@ def test_example_330():
                                                            [nodes.literal, "bar"])])
 
 
+def test_unmatched_backtick_runs():
+    result = publish("x `a ``b ```c `d ```")
+    assert_node(result, [nodes.document, nodes.paragraph, ("x ",
+                                                           [nodes.literal, "a ``b ```c "],
+                                                           "d ```")])
+
+
 def test_example_331():
     result = publish("*foo bar*")
     assert_node(result, [nodes.document, nodes.paragraph, nodes.emphasis, "foo bar"])
@@ -548,6 +555,14 @@ def test_example_456():
                                                                            [nodes.literal, "_"])])
 
 
+def test_unmatched_emphasis_markers():
+    result = publish("*a **b " * 3 + "c** d*")
+    assert_node(result, [nodes.document, nodes.paragraph, ("*a **b *a **b ",
+                                                           [nodes.emphasis, ("a ",
+                                                                             [nodes.strong, "b c"],
+                                                                             " d")])])
+
+
 def test_example_565():
     result = publish("<http://foo.bar.baz>")
     assert_node(result, [nodes.document, nodes.paragraph, nodes.reference, "http://foo.bar.baz"])
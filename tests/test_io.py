@@ -0,0 +1,67 @@
+"""
+    test_io
+    ~~~~~~~
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+import mmap
+from unittest import mock
+
+from docutils import nodes
+from utils import assert_node
+
+from pycmark import parse_file
+
+
+def test_parse_file(tmp_path):
+    path = tmp_path / 'sample.md'
+    path.write_bytes("# Heading\r\n\r\nLorem *ipsüm*\r\n".encode())
+    document = parse_file(str(path))
+    assert_node(document, [nodes.document, ([nodes.title, "Heading"],
+                                            [nodes.paragraph, ("Lorem ",
+                                                               [nodes.emphasis, "ipsüm"])])])
+    assert document['title'] == 'Heading'
+    assert document['source'] == str(path)
+
+
+def test_parse_empty_file(tmp_path):
+    path = tmp_path / 'empty.md'
+    path.write_bytes(b'')
+    document = parse_file(str(path))
+    assert_node(document, [nodes.document, ()])
+
+
+def test_parse_file_with_input_encoding(tmp_path):
+    path = tmp_path / 'latin1.md'
+    path.write_bytes("Lorem *ipsüm*\n".encode('latin-1'))
+    document = parse_file(str(path), settings_overrides={'input_encoding': 'latin-1'})
+    assert_node(document, [nodes.document, nodes.paragraph, ("Lorem ",
+                                                             [nodes.emphasis, "ipsüm"])])
+
+
+def test_parse_file_with_error_handler(tmp_path):
+    path = tmp_path / 'broken.md'
+    path.write_bytes(b"Lorem \xff\n")
+    document = parse_file(str(path), settings_overrides={'input_encoding_error_handler': 'replace'})
+    assert_node(document, [nodes.document, nodes.paragraph, "Lorem �"])
+
+
+def test_parse_file_closes_mapping(tmp_path):
+    path = tmp_path / 'sample.md'
+    path.write_bytes(b"Lorem ipsum\n")
+
+    mappings = []
+
+    def mapper(*args, **kwargs):
+        mappings.append(original(*args, **kwargs))
+        return mappings[-1]
+
+    original = mmap.mmap
+    with mock.patch('pycmark.io.mmap.mmap', mapper):
+        document = parse_file(str(path))
+
+    assert_node(document, [nodes.document, nodes.paragraph, "Lorem ipsum"])
+    assert len(mappings) == 1
+    assert mappings[0].closed
@@ -0,0 +1,172 @@
+"""
+    test_parallel
+    ~~~~~~~~~~~~~
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+from io import StringIO
+from unittest import mock
+
+import utils
+from docutils import nodes
+from docutils.core import publish_doctree
+from utils import publish
+
+from pycmark.inlineparser import InlineParser
+from pycmark.parallel import (
+    ParallelBlockParser,
+    ParallelInlineTransform,
+    decode_nodes,
+    encode_nodes,
+)
+from pycmark.transforms import InlineTransform
+
+TEXT = ("# Hello *world*\n"
+        "\n"
+        "Lorem & __ipsum__ [dolor] `sit` <http://example.com>  \n"
+        "![*amet*](/img.png \"title\") [foo][bar] **baz*\n"
+        "\n"
+        "> - [dolor]\n"
+        ">\n"
+        ">   qux\\*\n"
+        "\n"
+        "[dolor]: /url 'title'\n"
+        "[bar]: </bar>\n")
+
+
+# blocks containing blank lines across the boundaries of chunks
+BLOCKS = ("# Heading\n"
+          "\n"
+          "```\n"
+          "code\n"
+          "\n"
+          "more code\n"
+          "```\n"
+          "\n"
+          "- [foo]\n"
+          "\n"
+          "  bar\n"
+          "\n"
+          "Lorem *ipsum*\n"
+          "\n"
+          "<!-- comment\n"
+          "\n"
+          "comment -->\n"
+          "\n"
+          "> quote\n"
+          "\n"
+          "## [foo]\n"
+          "\n"
+          "[foo]: /url1\n"
+          "\n"
+          "[foo]: /url2\n")
+
+
+class ParallelParser(utils.TestParser):
+    inline_workers = 2
+    inline_workers_threshold = 0
+
+
+class ParallelBlocksParser(utils.TestParser):
+    block_workers = 2
+    block_workers_threshold = 0
+
+
+def test_parallel_transforms():
+    transforms = ParallelParser().get_transforms()
+    assert ParallelInlineTransform in transforms
+    assert InlineTransform not in transforms
+
+
+def test_ParallelInlineTransform():
+    expected = publish(TEXT)
+    parser = ParallelParser()
+    try:
+        result = publish(TEXT, parser=parser)
+        assert result.pformat() == expected.pformat()
+
+        # the pool of worker processes is reused for the following documents
+        executor = parser.executor
+        assert executor is not None
+        result = publish(TEXT, parser=parser)
+        assert result.pformat() == expected.pformat()
+        assert parser.executor is executor
+    finally:
+        parser.shutdown()
+    assert parser.executor is None
+
+
+def test_ParallelInlineTransform_under_threshold():
+    class Parser(ParallelParser):
+        inline_workers_threshold = len(TEXT)
+
+    with mock.patch('pycmark.ProcessPoolExecutor') as executor:
+        result = publish(TEXT, parser=Parser())
+        executor.assert_not_called()
+
+    assert result.pformat() == publish(TEXT).pformat()
+
+
+def test_ParallelBlockParser():
+    expected = publish(BLOCKS)
+    parser = ParallelBlocksParser()
+    with mock.patch.object(ParallelBlockParser, 'chunks_per_worker', 10):
+        try:
+            result = publish(BLOCKS, parser=parser)
+        finally:
+            parser.shutdown()
+    assert result.pformat() == expected.pformat()
+    assert [node.line for node in result.findall(nodes.Element)] == \
+        [node.line for node in expected.findall(nodes.Element)]
+    assert result.nameids == expected.nameids
+
+
+def test_ParallelBlockParser_reports_messages():
+    text = BLOCKS + "\n[foo]: /url3\n\n> [bar]: /bar\n> [bar]: /bar2\n"
+    for chunks in (1, 10):
+        parser = ParallelBlocksParser()
+        stream = StringIO()
+        with mock.patch.object(ParallelBlockParser, 'chunks_per_worker', chunks):
+            try:
+                publish_doctree(text, source_path='dummy.md', parser=parser,
+                                settings_overrides={'warning_stream': stream})
+            finally:
+                parser.shutdown()
+
+        # duplicated in a chunk, and across chunks
+        assert sorted(stream.getvalue().splitlines()) == [
+            'dummy.md:25: (WARNING/2) Duplicate explicit target name: "foo"',
+            'dummy.md:27: (WARNING/2) Duplicate explicit target name: "foo"',
+            'dummy.md:29: (WARNING/2) Duplicate explicit target name: "bar"',
+        ]
+
+
+def test_ParallelBlockParser_split():
+    parser = ParallelBlockParser(ParallelBlocksParser(), 2)
+    lines = BLOCKS.splitlines(True)
+    assert parser.is_boundary_candidate(lines, 2) is False  # fenced code block
+    assert parser.is_boundary_candidate(lines, 5) is True  # looks like a paragraph
+    assert parser.is_boundary_candidate(lines, 10) is False  # indented
+    assert parser.is_boundary_candidate(lines, 12) is True
+
+    with mock.patch.object(ParallelBlockParser, 'chunks_per_worker', 10):
+        assert parser.split(lines) == [0, 5, 12, 16, 20, 22, 24]
+
+
+def test_encode_nodes():
+    parser = InlineParser()
+    parser.add_processors(processor(parser) for processor in utils.TestParser().get_inline_processors())
+    document = nodes.document(None, None)
+    para = nodes.paragraph()
+    para += nodes.Text("*foo* [bar](/url) `baz`")
+    document += para
+    parser.parse(para)
+
+    encoded = encode_nodes(para)
+    assert encoded[1] == " "  # Text is encoded to a string
+    assert encoded[2][0] is nodes.reference
+    decoded = nodes.paragraph()
+    decoded.extend(decode_nodes(encoded))
+    assert decoded.pformat() == para.pformat()
@@ -8,10 +8,12 @@
 
 import re
 
+import pytest
+
 from pycmark.blockparser import BlockProcessor
 from pycmark.readers import (
-    LineReader, BlockQuoteReader, FencedCodeBlockReader, IndentedCodeBlockReader,
-    ListItemReader, LazyLineReader, TextReader
+    LineBuffer, LineIndex, LineReader, LineReaderDecorator, BlockQuoteReader, FencedCodeBlockReader,
+    IndentedCodeBlockReader, ListItemReader, LazyLineReader, StreamLineReader, TextReader
 )
 
 
@@ -75,6 +77,128 @@ def test_LineReader():
         pass
 
 
+def test_try_fetch():
+    reader = LineReader(quoted_text.splitlines(True))
+    quoted_reader = BlockQuoteReader(reader)
+    assert quoted_reader.try_fetch(1) == "Lorem ipsum dolor sit amet, \n"
+    assert quoted_reader.try_fetch(2) is None
+    assert quoted_reader.try_fetch(2, lazy=True) == " consectetur adipiscing elit, \n"
+    assert reader.try_fetch(5) == "ut labore et dolore magna aliqua."
+    assert reader.try_fetch(6) is None
+
+    # iteration stops at the end of the container
+    assert list(quoted_reader) == ["Lorem ipsum dolor sit amet, \n"]
+
+
+def test_decorator_implementing_fetch_only():
+    class UpperCaseReader(LineReaderDecorator):
+        def fetch(self, relative: int = 0, **kwargs) -> str:
+            return self.reader.fetch(relative, **kwargs).upper()
+
+    reader = UpperCaseReader(BlockQuoteReader(LineReader(quoted_text.splitlines(True))))
+    assert reader.try_fetch(1) == "LOREM IPSUM DOLOR SIT AMET, \n"
+    assert reader.try_fetch(2) is None
+    assert reader.eof() is False
+    assert reader.readline() == "LOREM IPSUM DOLOR SIT AMET, \n"
+    assert reader.eof() is True
+
+
+def test_decorator_implementing_neither_fetch_nor_try_fetch():
+    class DummyReader(LineReaderDecorator):
+        pass
+
+    reader = DummyReader(LineReader(quoted_text.splitlines(True)))
+    with pytest.raises(NotImplementedError):
+        reader.fetch(1)
+    with pytest.raises(NotImplementedError):
+        reader.try_fetch(1)
+
+
+def test_LineBuffer():
+    lines = LineBuffer("foo\nbar\r\nbaz\rqux\x0cquux\u2028\n\nend")
+    assert len(lines) == 6
+    assert list(lines) == ["foo\n", "bar\n", "baz\n", "qux\x0cquux\u2028\n", "\n", "end"]
+    assert lines[-1] == "end"
+    assert lines[1:3] == ["bar\n", "baz\n"]
+    assert list(lines.offsets) == [0, 4, 9, 13, 23, 24, 27]
+
+    try:
+        lines[6]
+        assert False
+    except IndexError:
+        pass
+
+    # empty text
+    assert list(LineBuffer("")) == []
+    assert list(LineBuffer("\n")) == ["\n"]
+
+
+def test_LineBuffer_with_bytes():
+    lines = LineBuffer("\ufefffoo\r\nb\u00e4r".encode())
+    assert list(lines) == ["foo\n", "b\u00e4r"]
+    assert list(lines.offsets) == [3, 8, 12]
+
+    reader = LineReader(lines)
+    assert reader.readline() == "foo\n"
+    assert reader.readline() == "b\u00e4r"
+    assert reader.eof() is True
+
+
+def test_LineIndex():
+    lines = ["foo\n", "  \tbar\n", "   \n", "\n", "- baz"]
+    index = LineIndex(lines)
+    assert len(index) == 5
+    assert list(index.offsets) == [0, 4, 11, 15, 16, 21]
+    assert list(index.indents) == [0, 4, 3, 0, 0]
+    assert index.first_chars == "fb\n\n-"
+    assert [flags & LineIndex.BLANK for flags in index.flags] == [0, 0, 1, 1, 0]
+    assert [flags & LineIndex.HAS_TAB for flags in index.flags] == [0, 2, 0, 0, 0]
+
+
+def test_line_metadata():
+    reader = LineReader(quoted_text.splitlines(True))
+    assert reader.first_char(1) == '>'
+    assert reader.indent(2) == 1
+    assert reader.is_blank(3) is True
+    assert reader.first_char(6) is None
+    assert reader.is_blank(6) is False
+
+    # metadata of the lines in the container
+    quoted_reader = BlockQuoteReader(reader)
+    assert quoted_reader.first_char(1) == 'L'
+    assert quoted_reader.indent(1) == 0
+    assert quoted_reader.first_char(2) is None
+    assert quoted_reader.first_char(2, lazy=True) == 'c'
+    assert LazyLineReader(quoted_reader).indent(2) == 1
+
+    # metadata of the lines in a list item
+    reader = LineReader(["- foo\n", "      bar\n", "\n", "baz\n"])
+    item_reader = ListItemReader(reader, '-', BlockProcessor(None))
+    assert item_reader.item_indent == 2
+    assert item_reader.indent(1) == 0
+    assert item_reader.indent(2) == 4
+    assert item_reader.is_blank(3) is True
+    assert item_reader.indent(4) is None
+    assert LazyLineReader(item_reader).indent(4) == 0
+
+
+def test_StreamLineReader():
+    reader = StreamLineReader(iter(["> foo\n", "> bar\n", "baz"]))
+    assert reader.eof() is False
+    assert reader.first_char(1) == '>'
+    assert BlockQuoteReader(reader).readline() == "foo\n"
+    assert reader.next_line == "> bar\n"
+    assert len(reader.lines) == 2
+
+    # the lines before the current line are dropped
+    reader.step()
+    reader.discard()
+    assert reader.lines == []
+    assert reader.readline() == "baz"
+    assert reader.eof() is True
+    assert reader.try_fetch(1) is None
+
+
 def test_BlockQuoteReader():
     reader = LineReader(quoted_text.splitlines(True), source='dummy.md')
     quoted_reader = BlockQuoteReader(reader)
@@ -232,6 +356,46 @@ def test_nested_line_readers():
     assert reader.readline() == 'continued here.\n'
 
 
+def test_deeply_nested_line_readers():
+    depth = 2000  # deeper than the recursion limit
+    text = ("> " * depth + "Blockquote\n" +
+            "> " * (depth - 1) + "\n")
+    reader = BlockQuoteReader(LineReader(text.splitlines(True)))
+    for _ in range(depth - 1):
+        reader = BlockQuoteReader(reader)
+
+    assert reader.eof() is False
+    assert reader.readline() == 'Blockquote\n'
+    assert reader.eof() is True
+    assert reader.lineno == 1
+    assert reader.reader.next_line == '\n'
+
+
+def test_ContainerReader_caches_stripped_lines():
+    class CountingReader(LineReader):
+        fetched = 0
+
+        def try_fetch(self, relative: int = 0, **kwargs) -> str:
+            self.fetched += 1
+            return super().try_fetch(relative, **kwargs)
+
+    root = CountingReader(["> > foo\n", "> > bar\n"])
+    reader = BlockQuoteReader(BlockQuoteReader(root))
+    assert reader.next_line == 'foo\n'
+    assert reader.eof() is False
+    assert reader.next_line == 'foo\n'
+    assert root.fetched == 1
+
+    # the cache is invalidated when the current line moves
+    reader.step()
+    assert reader.next_line == 'bar\n'
+    assert root.fetched == 2
+
+    # keyword arguments are a part of the cache key
+    assert reader.fetch(1, lazy=True) == 'bar\n'
+    assert root.fetched == 3
+
+
 def test_TextReader():
     text = "hello world"
     reader = TextReader(text)
@@ -253,3 +417,22 @@ def test_TextReader():
 
     reader.step(1)
     assert reader.remain == ''
+
+
+def test_TextReader_position_based_methods():
+    reader = TextReader("hello world")
+    assert reader.peek() == 'h'
+    assert reader.at_end is False
+    assert reader.match(re.compile(r'\w+')).group(0) == 'hello'
+    assert reader.position == 0
+
+    reader.step(5)
+    assert reader.peek() == ' '
+    assert reader.match(re.compile(r'\w+')) is None
+    assert reader.match(re.compile(r'^ ')) is None  # matched against the whole text
+    assert reader.match(re.compile(r'(?<=o) '))
+
+    matched = reader.consume(re.compile(r' (\w+)'))
+    assert matched.group(1) == 'world'
+    assert reader.peek() == ''
+    assert reader.at_end is True
@@ -0,0 +1,106 @@
+"""
+    test_streaming
+    ~~~~~~~~~~~~~~
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+from io import StringIO
+
+from docutils import nodes
+from utils import assert_node
+
+from pycmark import Parser, iterparse
+from pycmark.streaming import BlockStream
+
+
+def test_iterparse():
+    text = ("# Heading\n"
+            "\n"
+            "Lorem *ipsum*\n"
+            "\n"
+            "> dolor\n"
+            "\n"
+            "- sit\n"
+            "- amet\n")
+    blocks = list(iterparse(StringIO(text)))
+    assert len(blocks) == 4
+    assert_node(blocks[0], [nodes.section, nodes.title, "Heading"])
+    assert_node(blocks[1], [nodes.paragraph, ("Lorem ",
+                                              [nodes.emphasis, "ipsum"])])
+    assert_node(blocks[2], [nodes.block_quote, nodes.paragraph, "dolor"])
+    assert_node(blocks[3], [nodes.bullet_list, ([nodes.list_item, "sit"],
+                                                [nodes.list_item, "amet"])])
+
+
+def test_iterparse_yields_blocks_incrementally():
+    consumed = []
+
+    def lines():
+        for i in range(1000):
+            consumed.append(i)
+            yield "paragraph %d\n" % i
+            yield "\n"
+
+    stream = BlockStream(Parser(), lines())
+    for i, block in enumerate(stream):
+        assert_node(block, [nodes.paragraph, "paragraph %d" % i])
+        assert len(consumed) <= i + 2
+        assert len(stream.reader.lines) <= 2
+
+
+def test_iterparse_with_forward_references():
+    consumed = []
+
+    def lines():
+        for line in ["[foo]\n", "\n", "bar\n", "\n", "[foo]: /url\n", "\n", "baz\n"]:
+            consumed.append(line)
+            yield line
+
+    blocks = []
+    for block in iterparse(lines()):
+        blocks.append((block, len(consumed)))
+
+    # blocks are held until the link label is defined
+    assert_node(blocks[0][0], [nodes.paragraph, nodes.reference, "foo"])
+    assert next(blocks[0][0].findall(nodes.reference))['refuri'] == '/url'
+    assert blocks[0][1] >= 5
+    assert_node(blocks[1][0], [nodes.paragraph, "bar"])
+    assert_node(blocks[2][0], nodes.target)
+    assert_node(blocks[3][0], [nodes.paragraph, "baz"])
+
+
+def test_iterparse_without_forward_references():
+    text = ("[foo]\n"
+            "\n"
+            "[foo]: /url\n"
+            "\n"
+            "[foo]\n")
+    blocks = list(iterparse(StringIO(text), forward_references=False))
+    assert_node(blocks[0], [nodes.paragraph, "[foo]"])
+    assert_node(blocks[1], nodes.target)
+    assert_node(blocks[2], [nodes.paragraph, nodes.reference, "foo"])
+
+
+def test_iterparse_with_undefined_labels():
+    blocks = list(iterparse(StringIO("[INFO] started\n\n[INFO] stopped\n")))
+    assert_node(blocks[0], [nodes.paragraph, "[INFO] started"])
+    assert_node(blocks[1], [nodes.paragraph, "[INFO] stopped"])
+
+
+def test_iterparse_holds_limited_blocks(monkeypatch):
+    consumed = []
+
+    def lines():
+        yield "[foo]\n"
+        for i in range(100):
+            consumed.append(i)
+            yield "\n"
+            yield "paragraph %d\n" % i
+
+    monkeypatch.setattr(BlockStream, 'max_held_blocks', 10)
+    stream = BlockStream(Parser(), lines())
+    block = next(iter(stream))
+    assert_node(block, [nodes.paragraph, "[foo]"])  # released without the definition
+    assert len(consumed) <= 10
@@ -0,0 +1,96 @@
+"""
+    test_transforms
+    ~~~~~~~~~~~~~~~
+
+    :copyright: Copyright 2017-2019 by Takeshi KOMIYA
+    :license: Apache License 2.0, see LICENSE for details.
+"""
+
+import pytest
+import utils
+from docutils import nodes
+from utils import publish, assert_node
+
+from pycmark import addnodes
+from pycmark.transforms import (
+    BlanklineFilter,
+    EmphasisConverter,
+    FusedCleanupTransform,
+    FusedConverterTransform,
+    SectionTreeConstructor,
+    SparseTextConverter,
+)
+
+DOCUMENTS = [
+    "Hello *world* & __strong__ [link](/url) `code`\n",
+    "- foo\n- *bar*\n\n  baz\n- [qux]\n",
+    "1. foo\n2. bar\n   - baz\n\n     qux\n",
+    "> # heading\n> *a **b** c* \\* &amp; [x]\n\n[x]: /url 'title'\n",
+    "![*image* alt](/img.png) *a_ **b* ]\n\n\n    code\n",
+    "foo  \nbar\\\nbaz\n",
+    "# foo\n\n### bar\n\n- baz\n\n  ## qux\n\n> # quux\n>\n> corge\n\n# grault\n",
+]
+
+
+class FusedParser(utils.TestParser):
+    fused_transforms = True
+
+
+def test_fused_transforms():
+    transforms = FusedParser().get_transforms()
+    assert FusedCleanupTransform in transforms
+    assert FusedConverterTransform in transforms
+    assert BlanklineFilter not in transforms
+    assert SectionTreeConstructor not in transforms
+    assert SparseTextConverter not in transforms
+
+
+def test_fused_transforms_keep_priorities():
+    # transforms of other priorities see the same tree as without fusing
+    for fused in (FusedCleanupTransform, FusedConverterTransform):
+        for transform in fused.fused_transforms:
+            assert transform.default_priority == fused.default_priority
+
+
+@pytest.mark.parametrize('text', DOCUMENTS)
+def test_FusedCleanupTransform(text):
+    expected = publish(text)
+    result = publish(text, parser=FusedParser())
+    assert result.pformat() == expected.pformat()
+
+
+def test_TextNodeConnector():
+    result = publish("&amp;*x*&amp;&amp;")
+    assert_node(result, [nodes.document, nodes.paragraph, ("&",
+                                                           [nodes.emphasis, "x"],
+                                                           "&&")])
+
+
+def test_EmphasisConverter():
+    # markers built by other processors than the standard ones
+    def marker(text, can_open, can_close):
+        return addnodes.emphasis(marker=text, can_open=can_open, can_close=can_close,
+                                 orig_length=len(text), curr_length=len(text),
+                                 interior=can_open and can_close)
+
+    paragraph = nodes.paragraph()
+    paragraph += marker('***', True, False)
+    paragraph += nodes.Text('foo')
+    paragraph += marker('**', False, True)
+    EmphasisConverter(paragraph).apply()
+    assert_node(paragraph, [nodes.paragraph, ("*",
+                                              [nodes.strong, "foo"])])
+
+
+def test_SectionTreeConstructor():
+    result = publish("# foo\n\n### bar\n\nbaz\n\n## qux\n\n# quux\n\n> # a\n> b\n")
+    assert_node(result, [nodes.document, ([nodes.section, ([nodes.title, "foo"],
+                                                           [nodes.section, ([nodes.title, "bar"],
+                                                                            [nodes.paragraph, "baz"])],
+                                                           [nodes.section, nodes.title, "qux"])],
+                                          [nodes.section, ([nodes.title, "quux"],
+                                                           nodes.block_quote)])])
+    assert_node(result[1][1], [nodes.block_quote, nodes.section, ([nodes.title, "a"],
+                                                                  [nodes.paragraph, "b"])])
+    assert_node(result[0][1], nodes.section, depth=2)  # <h3> is recognized as <h2>
+    assert_node(result[0][2], nodes.section, depth=2)
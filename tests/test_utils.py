@@ -6,7 +6,7 @@
     :license: Apache License 2.0, see LICENSE for details.
 """
 
-from pycmark.utils import expand_leading_tabs
+from pycmark.utils import expand_leading_tabs, get_leading_spaces_pattern
 
 
 def test_expand_leading_tabs():
@@ -51,3 +51,14 @@ def test_expand_leading_tabs_with_markers():
 
     text = " 1.\tLorem ipsum\tdolor sit amet"
     assert expand_leading_tabs(text, [r'\d+\.']) == " 1. Lorem ipsum\tdolor sit amet"
+
+
+def test_expand_leading_tabs_without_tabs():
+    text = "  > - Lorem ipsum dolor sit amet"
+    assert expand_leading_tabs(text, ['>', '[-+*]']) is text
+
+
+def test_get_leading_spaces_pattern():
+    pattern = get_leading_spaces_pattern(('>', '[-+*]'))
+    assert pattern.match(" >\t- foo").group(0) == " >\t- "
+    assert get_leading_spaces_pattern(('>', '[-+*]')) is pattern
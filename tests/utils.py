@@ -27,8 +27,8 @@ class TestParser(Parser):
         return transforms
 
 
-def publish(text):
+def publish(text, parser=None):
     return publish_doctree(source=text,
                            source_path='dummy.md',
                            reader=TestReader(),
-                           parser=TestParser())
+                           parser=parser or TestParser())